@@ -1,22 +1,27 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from objects import Vector, Entity, random_vector
 from entities import Ship, Asteroid, Scrap
 from weapons import EnemyBlaster, EnemyGatlingGun, EnemySniper
 from player import Player_Ship
 import effects
 import images
+import sprites
 import game
 import random
 import math
 import pygame
 
+# This allows type hinting for RenderQueue, done this way to avoid circular import errors
+if TYPE_CHECKING:
+    from graphics import RenderQueue
+
 PATROL = 0
 ATTACK = 1
 RETREAT = 2
 ATTACK_ENEMY = 3
 PATROL_TO_STATION = 4
 
-level_text_cache = dict()
-
 
 
 class AI_Ship(Ship):
@@ -202,23 +207,21 @@ class AI_Ship(Ship):
             del game.KILLED_SHIP_IMAGES[0]
         game.KILLED_SHIP_IMAGES.append(self.load_image)
 
-    def draw(self, win: pygame.Surface, focus_point):
+    def draw(self, win: RenderQueue, focus_point):
         super().draw(win, focus_point)
 
         if game.DEBUG_SCREEN:
 
-            # Checking to see if level text has not been cached already
-            if f"Lvl: {self.level}, {game.ZOOM}" not in level_text_cache:
-                text_surface = pygame.font.SysFont("consolas", int(15 * game.ZOOM)).render(f"Lvl: {self.level}", True, (255, 255, 255))
-                level_text_cache[f"Lvl: {self.level}, {game.ZOOM}"] = text_surface
-            else:
-                text_surface: pygame.Surface = level_text_cache[f"Lvl: {self.level}, {game.ZOOM}"]
+            text_surface = sprites.get_text_image("consolas", 15, f"Lvl: {self.level}", (255, 255, 255), game.ZOOM)
 
-            game.WIN.blit(text_surface, ((self.position.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x - (text_surface.get_width() / 2), (self.position.y - focus_point.y - 20) * game.ZOOM + game.CENTRE_POINT.y - (text_surface.get_height() / 2)))
+            win.blit(text_surface, ((self.position.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x - (text_surface.get_width() / 2), (self.position.y - focus_point.y - 20) * game.ZOOM + game.CENTRE_POINT.y - (text_surface.get_height() / 2)))
 
 
 
 class Enemy_Ship(AI_Ship):
+    faction = game.ENEMY
+    hittable_by = game.PLAYER | game.NEUTRAL | game.STATION | game.EXPLOSION
+
     def __init__(self, position: Vector, velocity=Vector(0, 0), max_speed=250, level=0, rotation=0, max_rotation_speed=5, weapon=EnemyBlaster, scrap_count=1, health=2, armour=0, shield=0, shield_delay=1, shield_recharge=1, state=PATROL, mother_ship=None, image=lambda: images.ENEMY_SHIP) -> None:
         super().__init__(position, velocity, max_speed, level, rotation, max_rotation_speed, weapon, health, armour, shield, shield_delay, shield_recharge, state, image)
         self.scrap_count = scrap_count
@@ -297,10 +300,10 @@ class Enemy_Ship(AI_Ship):
         if self.mother_ship:
             self.mother_ship.group_attack_player()
 
-    def draw(self, win: pygame.Surface, focus_point):
+    def draw(self, win: RenderQueue, focus_point):
         super().draw(win, focus_point)
         if game.DEBUG_SCREEN:
-            pygame.draw.circle(game.WIN, (255, 0, 0), ((self.patrol_point.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x, (self.patrol_point.y - focus_point.y) * game.ZOOM + game.CENTRE_POINT.y), 20 * game.ZOOM)
+            pygame.draw.circle(win.get_surface(), (255, 0, 0), ((self.patrol_point.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x, (self.patrol_point.y - focus_point.y) * game.ZOOM + game.CENTRE_POINT.y), 20 * game.ZOOM)
 
 
 
@@ -342,16 +345,15 @@ class Missile_Ship(Enemy_Ship):
     def explode(self, radius):
         self.scrap_count = 0
 
-        # Have to create separate list otherwise the set game.CHUNKS.entities will change size while iterating though it
+        # Have to create separate list otherwise the loaded entities will change size while iterating though them
         entities_to_damage = []
         damage_values = []
 
-        for entity in game.CHUNKS.entities:
-            if isinstance(entity, Ship):
-                distance = entity.distance_to(self)
-                if distance < radius:
-                    entities_to_damage.append(entity)
-                    damage_values.append(1 - distance / self.explode_radius)
+        for entity in game.CHUNKS.spatial.query_radius(self.position, radius):
+            distance = entity.distance_to(self)
+            if entity.hittable_by & game.EXPLOSION and distance < radius:
+                entities_to_damage.append(entity)
+                damage_values.append(1 - distance / self.explode_radius)
 
         for i, entity in enumerate(entities_to_damage):
             entity.damage(self.explode_damage * damage_values[i])
@@ -463,10 +465,10 @@ class Mother_Ship(Enemy_Ship):
             self.current_station.entities_to_spawn += 1
 
 
-    def draw(self, win: pygame.Surface, focus_point):
+    def draw(self, win: RenderQueue, focus_point):
         super().draw(win, focus_point)
         if game.DEBUG_SCREEN:
-            pygame.draw.circle(game.WIN, (0, 0, 255), ((self.patrol_point.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x, (self.patrol_point.y - focus_point.y) * game.ZOOM + game.CENTRE_POINT.y), 20 * game.ZOOM)
+            pygame.draw.circle(win.get_surface(), (0, 0, 255), ((self.patrol_point.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x, (self.patrol_point.y - focus_point.y) * game.ZOOM + game.CENTRE_POINT.y), 20 * game.ZOOM)
 
 
     def group_attack_player(self):
@@ -479,6 +481,9 @@ class Mother_Ship(Enemy_Ship):
 
 
 class Neutral_Ship(AI_Ship):
+    faction = game.NEUTRAL
+    hittable_by = game.PLAYER | game.ENEMY | game.STATION | game.EXPLOSION
+
     def __init__(self, position: Vector, velocity=Vector(0, 0), max_speed=100, level=0, rotation=0, max_rotation_speed=5, weapon=EnemyBlaster, health=1, armour=0, shield=0, shield_delay=1, shield_recharge=1, state=PATROL, current_station=None, image=lambda: images.NEUTRAL_SHIP) -> None:
         super().__init__(position, velocity, max_speed, level, rotation, max_rotation_speed, weapon, health, armour, shield, shield_delay, shield_recharge, state, image)
 
@@ -509,11 +514,10 @@ class Neutral_Ship(AI_Ship):
             self.state = PATROL_TO_STATION
 
         else:
-            # Loop through entities to find friendly station entities
-            stations = []
-            for entity in game.CHUNKS.entities:
-                if type(entity).__name__ == "FriendlyStation":
-                    stations.append(entity)
+            # Find loaded friendly station entities
+            # Imported here as station imports this file, so a circular import is avoided
+            from station import FriendlyStation
+            stations = game.CHUNKS.get_entities(FriendlyStation)
 
             # Remove current station so it is not an option to travel to
             if current_station in stations:
@@ -560,13 +564,13 @@ class Neutral_Ship(AI_Ship):
                 self.current_station = self.target_station
                 self.target_station = None
 
-    def draw(self, win: pygame.Surface, focus_point):
+    def draw(self, win: RenderQueue, focus_point):
         super().draw(win, focus_point)
         if game.DEBUG_SCREEN:
-            pygame.draw.circle(game.WIN, (0, 255, 0), ((self.patrol_point.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x, (self.patrol_point.y - focus_point.y) * game.ZOOM + game.CENTRE_POINT.y), 20 * game.ZOOM)
+            pygame.draw.circle(win.get_surface(), (0, 255, 0), ((self.patrol_point.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x, (self.patrol_point.y - focus_point.y) * game.ZOOM + game.CENTRE_POINT.y), 20 * game.ZOOM)
 
             if self.intermediate_patrol_point:
-                pygame.draw.circle(game.WIN, (200, 100, 0), ((self.intermediate_patrol_point.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x, (self.intermediate_patrol_point.y - focus_point.y) * game.ZOOM + game.CENTRE_POINT.y), 20 * game.ZOOM)
+                pygame.draw.circle(win.get_surface(), (200, 100, 0), ((self.intermediate_patrol_point.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x, (self.intermediate_patrol_point.y - focus_point.y) * game.ZOOM + game.CENTRE_POINT.y), 20 * game.ZOOM)
 
 
 
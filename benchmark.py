@@ -0,0 +1,536 @@
+"""
+This file has benchmarks for the game's performance critical code
+
+Run with: python benchmark.py [name]
+If no name is given, every benchmark is run
+
+A world is generated with a fixed seed, it is not saved
+"""
+
+import game
+from objects import Vector, random_vector
+from player import get_player
+from entities import Bullet, Asteroid, Scrap
+from laser import Laser
+from aiship import Enemy_Ship, Neutral_Ship
+from station import FriendlyStation
+from particles import ParticleSystem
+import effects
+import graphics
+import images
+import sprites
+import ui
+from time import perf_counter
+import random
+import math
+import sys
+
+
+
+def create_world(seed: int = 0) -> None:
+    game.reset_constants()
+    game.SEED = seed
+    game.init_chunks()
+    game.player = get_player()
+
+
+def time_frames(function, frames: int) -> float:
+    """Returns the average time in milliseconds of calling `function` once per frame"""
+    start = perf_counter()
+    for _ in range(frames):
+        function()
+    return (perf_counter() - start) / frames * 1000
+
+
+
+def rebuild_loaded_entities() -> None:
+    """The original Chunks.update, rebuilds the loaded entities from every chunk in the square around the player"""
+    chunks = game.CHUNKS
+    chunk_coords = game.player.position // game.CHUNK_SIZE
+    entities = set()
+    for y in range(chunk_coords.y - game.LOAD_DISTANCE, chunk_coords.y + game.LOAD_DISTANCE + 1):
+        for x in range(chunk_coords.x - game.LOAD_DISTANCE, chunk_coords.x + game.LOAD_DISTANCE + 1):
+            entities.update(chunks.get_chunk_from_coord((x, y)).entities)
+
+
+def chunk_update(frames: int = 1000) -> None:
+    """Frame cost of loading chunks while the player flies at max speed (crossing a chunk every ~70 frames)"""
+    create_world()
+    delta_time = 1 / 60
+
+    for load_distance in (5, 13, 26):
+        game.LOAD_DISTANCE = load_distance
+        game.CHUNKS.set_position(game.player, Vector(0, 0))
+        game.player.velocity = Vector(game.MAX_PLAYER_SPEED, 0)
+
+        # Rebuild is timed first so that it pays for generating the new chunks
+        def rebuild():
+            game.CHUNKS.move_entity(game.player, delta_time)
+            rebuild_loaded_entities()
+
+        rebuild_time = time_frames(rebuild, frames)
+
+        game.CHUNKS.set_position(game.player, Vector(0, 0))
+        game.CHUNKS.update(game.player)
+
+        def incremental():
+            game.CHUNKS.move_entity(game.player, delta_time)
+            game.CHUNKS.update(game.player)
+
+        incremental_time = time_frames(incremental, frames)
+
+        print(f"LOAD_DISTANCE {load_distance:>2}: incremental {incremental_time:.4f} ms, full rebuild {rebuild_time:.4f} ms")
+
+
+
+def bullets(count: int = 5000, frames: int = 60) -> None:
+    """Frame cost of updating and drawing `count` bullets fired by ships around the player, as entities and with the projectile engine"""
+    create_world()
+    game.CHUNKS.update(game.player)
+    graphics.update_graphics_screen_size()
+    delta_time = 1 / 60
+
+    random.seed(0)
+    ships = [Enemy_Ship(random_vector(random.random() * 1000), level=5) for _ in range(25)]
+    ships += [Neutral_Ship(random_vector(random.random() * 1000), level=5) for _ in range(25)]
+    for ship in ships:
+        game.CHUNKS.add_entity(ship)
+
+    def spawn_bullets(add) -> None:
+        """Keeps `count` bullets alive, bullets last 3 seconds"""
+        for _ in range(-(-count // 180)):
+            add(random_vector(random.random() * 1500), random_vector(600), random.random() * 6.28, random.choice(ships))
+
+    def add_bullet(position, velocity, rotation, ship):
+        game.CHUNKS.add_entity(Bullet(position, velocity, rotation, ship, damage=0, lifetime=3, image=lambda: images.RED_BULLET))
+
+    def add_projectile(position, velocity, rotation, ship):
+        game.CHUNKS.projectiles.add(position, velocity, rotation, ship, damage=0, lifetime=3, image=images.RED_BULLET)
+
+    def fill(add) -> None:
+        for _ in range(180):
+            spawn_bullets(add)
+            for bullet in game.CHUNKS.get_entities(Bullet):
+                bullet.update(delta_time)
+            game.CHUNKS.projectiles.update(delta_time)
+
+    def draw_bullets(entities) -> None:
+        for entity in entities:
+            entity.draw(game.WIN, game.player.position)
+
+    def entity_frame():
+        spawn_bullets(add_bullet)
+        bullet_entities = game.CHUNKS.get_entities(Bullet)
+        for bullet in bullet_entities:
+            bullet.update(delta_time)
+        draw_bullets(bullet_entities)
+
+    def projectile_frame():
+        spawn_bullets(add_projectile)
+        game.CHUNKS.projectiles.update(delta_time)
+        game.CHUNKS.projectiles.draw(game.WIN, game.player.position)
+
+    fill(add_bullet)
+    entity_time = time_frames(entity_frame, frames)
+    live_entities = len(game.CHUNKS.get_entities(Bullet))
+    for bullet in game.CHUNKS.get_entities(Bullet):
+        game.CHUNKS.remove_entity(bullet)
+
+    fill(add_projectile)
+    projectile_time = time_frames(projectile_frame, frames)
+
+    print(f"entities: {live_entities} bullets, {entity_time:.2f} ms")
+    print(f"projectiles: {len(game.CHUNKS.projectiles)} bullets, {projectile_time:.2f} ms")
+
+
+
+def asteroid_collision(frames: int = 200) -> None:
+    """Frame cost of updating 50 asteroids with 200 ships and 2000 bullets just outside of them (near misses) or far away"""
+    create_world()
+    game.CHUNKS.update(game.player)
+    delta_time = 1 / 60
+
+    random.seed(0)
+    asteroids = [Asteroid(Vector(x * 760 - 2280, y * 760 - 2660)) for y in range(8) for x in range(7)][:50]
+    for asteroid in asteroids:
+        game.CHUNKS.add_entity(asteroid)
+
+    def place_near(entity) -> None:
+        """Puts the entity within 60 units of an asteroid's opaque pixels, without touching them"""
+        asteroid = random.choice(asteroids)
+        mask = asteroid.mask
+        offset = Vector(asteroid.image.get_width() / 2 - entity.image.get_width() / 2, asteroid.image.get_height() / 2 - entity.image.get_height() / 2)
+        while True:
+            position = asteroid.position + random_vector(random.uniform(asteroid.radius * 0.5, asteroid.radius + 60))
+            pixel = position - asteroid.position + offset
+            if not mask.overlap(sprites.get_mask(entity.image, getattr(entity, "rotation", None)), (round(pixel.x), round(pixel.y))):
+                game.CHUNKS.set_position(entity, position)
+                return
+
+    ships = [Enemy_Ship(Vector(0, 0)) for _ in range(200)]
+    bullets = [Bullet(Vector(0, 0), Vector(0, 0), image=lambda: images.BULLET) for _ in range(2000)]
+    for entity in ships + bullets:
+        game.CHUNKS.add_entity(entity)
+        place_near(entity)
+
+    def update_asteroids():
+        for asteroid in asteroids:
+            asteroid.update(delta_time)
+
+    def set_radii(get_radius) -> None:
+        for entity in ships + bullets + asteroids:
+            # Some entities are placed touching a neighbouring asteroid, they are removed on the first update
+            if entity not in game.CHUNKS.spatial.bounds:
+                continue
+            game.CHUNKS.spatial.remove(entity)
+            entity.radius = get_radius(entity)
+            game.CHUNKS.spatial.insert(entity)
+
+    set_radii(lambda entity: math.hypot(entity.size.x, entity.size.y) / 2)
+    box_time = time_frames(update_asteroids, frames)
+
+    set_radii(lambda entity: sprites.get_radius(entity.image))
+    sprite_time = time_frames(update_asteroids, frames)
+
+    for entity in game.CHUNKS.get_entities(Enemy_Ship, Bullet):
+        game.CHUNKS.set_position(entity, entity.position + Vector(20_000, 0))
+    far_time = time_frames(update_asteroids, frames)
+
+    print(f"near misses, image diagonal radius: {box_time:.3f} ms")
+    print(f"near misses, sprite radius: {sprite_time:.3f} ms")
+    print(f"nothing near: {far_time:.3f} ms")
+
+
+
+def laser(frames: int = 200) -> None:
+    """Frame cost of raycasting the player's laser through 100 ships, at different ranges"""
+    create_world()
+    game.CHUNKS.update(game.player)
+
+    random.seed(0)
+    for _ in range(100):
+        game.CHUNKS.add_entity(Enemy_Ship(random_vector(random.uniform(300, 2500))))
+
+    player_laser = Laser(game.player)
+    for laser_range in (200, 600, 2000):
+        game.PLAYER_LASER_RANGE = laser_range
+
+        def raycast():
+            game.player.rotation += 0.05
+            player_laser.raycast()
+
+        print(f"range {laser_range:>4}: {time_frames(raycast, frames):.3f} ms")
+
+
+
+def laser_drawing(frames: int = 200) -> None:
+    """Frame cost of drawing the player's laser beam while the player turns, at different zooms and ranges (600 is the old upgrade cap)"""
+    create_world()
+    player_laser = Laser(game.player)
+
+    def draw():
+        game.player.rotation += 0.013
+        player_laser.shooting = True
+        player_laser.range = game.PLAYER_LASER_RANGE
+        render_queue = graphics.RenderQueue(game.WIN)
+        player_laser.draw(render_queue, game.player.position)
+        render_queue.flush()
+
+    for zoom in (game.MIN_ZOOM, 1.5, 4, game.MAX_ZOOM):
+        game.ZOOM = zoom
+        for laser_range in (600, 2000):
+            game.PLAYER_LASER_RANGE = laser_range
+            print(f"zoom {zoom}, range {laser_range:>4}: {time_frames(draw, frames):.3f} ms")
+
+
+
+def ship_drawing(count: int = 300, frames: int = 200) -> None:
+    """Frame cost of drawing ships that turn every frame, all on the screen"""
+    create_world()
+
+    random.seed(0)
+    ships = [Enemy_Ship(random_vector(random.uniform(0, 300))) for _ in range(count)]
+    delta_time = 1 / 60
+
+    def draw():
+        render_queue = graphics.RenderQueue(game.WIN)
+        for ship in ships:
+            ship.rotation += ship.max_rotation_speed * delta_time
+            ship.draw(render_queue, game.player.position)
+        render_queue.flush()
+
+    sprites.rotated_images.clear()
+    print(f"{count} ships: {time_frames(draw, frames):.3f} ms")
+    print(sprites.rotated_images.get_stats())
+
+
+
+def shields(count: int = 100, frames: int = 200) -> None:
+    """Frame cost of drawing the shields of ships that are recharging, all on the screen"""
+    create_world()
+
+    random.seed(0)
+    ships = [Enemy_Ship(random_vector(random.uniform(0, 300)), shield=3) for _ in range(count)]
+    for ship in ships:
+        ship.shield = random.uniform(0, ship.max_shield)
+
+    def draw():
+        render_queue = graphics.RenderQueue(game.WIN)
+        for ship in ships:
+            ship.shield = min(ship.shield + 0.01, ship.max_shield)
+            ship.draw(render_queue, game.player.position)
+        render_queue.flush()
+
+    print(f"{count} ships: {time_frames(draw, frames):.3f} ms")
+
+
+
+def particles(frames: int = 60) -> None:
+    """Frame cost of drawing the player's boost trail and two explosions, with the particles updated between frames"""
+    create_world()
+    game.player.velocity = Vector(0, -game.MAX_PLAYER_SPEED)
+    delta_time = 1 / 60
+
+    def update():
+        game.player.boost(delta_time)
+        game.CHUNKS.move_entity(game.player, delta_time)
+        game.CHUNKS.update(game.player)
+        game.CHUNKS.particles.update(delta_time)
+
+    # Boost until the trail is full, then explode twice
+    for _ in range(60):
+        update()
+    effects.explosion(game.player.position + Vector(100, 0))
+    effects.explosion(game.player.position - Vector(100, 0))
+
+    draw_times = []
+    def draw():
+        update()
+        start = perf_counter()
+        for layer in game.CHUNKS.particles.get_layers():
+            layer.draw(game.WIN, game.player.position)
+        draw_times.append((perf_counter() - start) * 1000)
+
+    time_frames(draw, frames)
+    print(f"{len(game.CHUNKS.particles)} systems: draw {sum(draw_times) / frames:.3f} ms, worst {max(draw_times):.3f} ms")
+
+
+
+def explosions(frames: int = 120) -> None:
+    """Frame cost of updating and drawing particles while explosions keep going off on the screen"""
+    create_world()
+    game.CHUNKS.update(game.player)
+    delta_time = 1 / 60
+
+    random.seed(0)
+    for per_frame in (1, 4, 16):
+        update_time = draw_time = particle_count = 0
+
+        for _ in range(frames):
+            for _ in range(per_frame):
+                effects.explosion(game.player.position + random_vector(random.uniform(0, 400)))
+
+            start = perf_counter()
+            game.CHUNKS.particles.update(delta_time)
+            update_time += perf_counter() - start
+
+            start = perf_counter()
+            for layer in game.CHUNKS.particles.get_layers():
+                layer.draw(game.WIN, game.player.position)
+            draw_time += perf_counter() - start
+
+            particle_count += sum(len(particle_system) for layer in game.CHUNKS.particles.get_layers() for particle_system in layer.systems)
+
+        print(f"{per_frame:>2} explosions per frame, {particle_count / frames:.0f} particles: update {update_time / frames * 1000:.3f} ms, draw {draw_time / frames * 1000:.3f} ms")
+
+        # Let the explosions finish before the next run
+        for _ in range(60):
+            game.CHUNKS.particles.update(delta_time)
+
+
+
+def particle_lod(frames: int = 120) -> None:
+    """Particles alive and frame cost of trail-like emitters spread around the player, zoomed in and zoomed out"""
+    create_world()
+    game.CHUNKS.update(game.player)
+    delta_time = 1 / 60
+
+    random.seed(0)
+    for zoom in (game.MAX_ZOOM, 1.5, game.MIN_ZOOM):
+        game.ZOOM = zoom
+        systems = [ParticleSystem(game.player.position + random_vector(random.uniform(0, 3000)), start_size=4, end_size=0,
+                                  duration=frames*delta_time, lifetime=0.4, frequency=150, speed_variance=50)
+                   for _ in range(60)]
+        update_time = draw_time = particle_count = 0
+
+        for _ in range(frames):
+            start = perf_counter()
+            game.CHUNKS.particles.update(delta_time)
+            update_time += perf_counter() - start
+
+            start = perf_counter()
+            for layer in game.CHUNKS.particles.get_layers():
+                layer.draw(game.WIN, game.player.position)
+            draw_time += perf_counter() - start
+
+            particle_count += game.CHUNKS.particles.particle_count
+
+        print(f"zoom {zoom:>3}, {len(systems)} emitters, {particle_count / frames:.0f} particles: update {update_time / frames * 1000:.3f} ms, draw {draw_time / frames * 1000:.3f} ms")
+
+        for _ in range(60):
+            game.CHUNKS.particles.update(delta_time)
+
+
+
+def sustained_fire(frames: int = 300) -> None:
+    """Particle systems made while the laser is held on a ship, and while gatling guns fire at it"""
+    create_world()
+    game.CHUNKS.update(game.player)
+    delta_time = 1 / 60
+
+    target = Enemy_Ship(game.player.position + Vector(0, -200), health=1e9)
+    game.CHUNKS.add_entity(target)
+    player_laser = Laser(game.player)
+    player_laser.delta_time = delta_time
+
+    def fire_laser():
+        player_laser.shoot()
+
+    def fire_gatling():
+        for _ in range(20 // 3 + 1):  # ~20 shots a second from three ships
+            target.damage(0.5, game.player)
+
+    for name, fire in (("laser", fire_laser), ("gatling", fire_gatling)):
+        systems = set()
+
+        def frame():
+            fire()
+            game.CHUNKS.particles.update(delta_time)
+            for layer in game.CHUNKS.particles.get_layers():
+                systems.update(layer.systems)
+
+        frame_time = time_frames(frame, frames)
+        print(f"{name}: {len(systems)} particle systems made in {frames} frames, {frame_time:.3f} ms per frame")
+
+
+
+def zooming(count: int = 500, frames: int = 120) -> None:
+    """Frame cost of drawing objects on the screen while zooming out and back in, like holding the zoom key"""
+    create_world()
+
+    random.seed(0)
+    objects = [Enemy_Ship(random_vector(random.uniform(0, 300)), rotation=random.random() * 2 * math.pi) for _ in range(count // 2)]
+    objects += [Scrap(random_vector(random.uniform(0, 300)), rotation=random.random() * 2 * math.pi) for _ in range(count - count // 2)]
+    objects += [Asteroid(Vector(-500, 0)), Asteroid(Vector(500, 0))]
+
+    frame_times = []
+    def draw():
+        game.ZOOM *= 1.02 if len(frame_times) >= frames // 2 else 1 / 1.02
+        start = perf_counter()
+        for entity in objects:
+            entity.draw(game.WIN, game.player.position)
+        frame_times.append((perf_counter() - start) * 1000)
+
+    game.ZOOM = 1.5
+    sprites.scaled_images.clear()
+    time_frames(draw, frames)
+    print(f"{len(objects)} objects: average {sum(frame_times) / frames:.3f} ms, worst {max(frame_times):.3f} ms")
+    print(sprites.scaled_images.get_stats())
+
+
+
+def station_zoom(frames: int = 90) -> None:
+    """Frame cost of zooming all the way in while next to a station"""
+    create_world()
+    station = FriendlyStation(game.player.position + Vector(100, 50))
+
+    frame_times = []
+    def draw():
+        game.ZOOM = min(game.ZOOM * 1.02, game.MAX_ZOOM)
+        start = perf_counter()
+        station.draw(game.WIN, game.player.position)
+        frame_times.append((perf_counter() - start) * 1000)
+
+    game.ZOOM = 1.5
+    sprites.scaled_images.clear()
+    sprites.tiles.clear()
+    time_frames(draw, frames)
+    print(f"zoom 1.5 to {game.ZOOM:.1f}: average {sum(frame_times) / frames:.3f} ms, worst {max(frame_times):.3f} ms")
+    print(sprites.scaled_images.get_stats())
+    print(sprites.tiles.get_stats())
+
+
+
+def stars(frames: int = 1000) -> None:
+    """Frame cost of drawing the background stars while the player moves"""
+    create_world()
+
+    def frame():
+        game.LAST_PLAYER_POS = game.player.position + Vector(300, 200)
+        graphics.draw_stars()
+
+    print(f"{game.WIDTH}x{game.HEIGHT}: {time_frames(frame, frames):.3f} ms")
+
+
+
+def draw_culling(frames: int = 200) -> None:
+    """Frame cost of finding the entities to draw with every chunk loaded, zoomed in and zoomed out"""
+    create_world()
+    game.LOAD_DISTANCE = 26
+
+    random.seed(0)
+    for _ in range(5000):
+        game.CHUNKS.add_entity(Bullet(random_vector(random.uniform(0, 15000)), Vector(0, 0), image=lambda: images.BULLET))
+    game.CHUNKS.update(game.player)
+
+    for zoom in (1.5, game.MIN_ZOOM):
+        game.ZOOM = zoom
+        for culling in (False, True):
+            game.ENTITY_CULLING = culling
+            count = len(graphics.get_entities_to_draw())
+            print(f"zoom {zoom}, {'aggressive' if culling else 'passive'}: {count} drawn of {len(game.CHUNKS.entities)} loaded, "
+                  f"{time_frames(graphics.get_entities_to_draw, frames):.3f} ms")
+
+
+
+def hud(frames: int = 300) -> None:
+    """Frame cost of drawing the HUD while the player flies around, with and without the debug screen"""
+    create_world()
+    game.CHUNKS.update(game.player)
+    delta_time = 1 / 60
+
+    def frame():
+        game.player.rotation += 0.01
+        ui.draw(delta_time)
+
+    for debug_screen in (False, True):
+        game.DEBUG_SCREEN = debug_screen
+        print(f"debug screen {'on' if debug_screen else 'off'}: {time_frames(frame, frames):.3f} ms")
+    game.DEBUG_SCREEN = False
+
+
+
+benchmarks = {
+    "chunk_update": chunk_update,
+    "bullets": bullets,
+    "asteroid_collision": asteroid_collision,
+    "laser": laser,
+    "laser_drawing": laser_drawing,
+    "ship_drawing": ship_drawing,
+    "shields": shields,
+    "particles": particles,
+    "explosions": explosions,
+    "particle_lod": particle_lod,
+    "sustained_fire": sustained_fire,
+    "zooming": zooming,
+    "station_zoom": station_zoom,
+    "stars": stars,
+    "draw_culling": draw_culling,
+    "hud": hud
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or benchmarks.keys()
+    for name in names:
+        print(f"--- {name} ---")
+        benchmarks[name]()
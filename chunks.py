@@ -1,20 +1,44 @@
 from __future__ import annotations
+from typing import Iterator
 from objects import Vector, Object, Entity
 from entities import Asteroid
 from station import FriendlyStation, EnemyStation
 from aiship import Mother_Ship
+from spatial import SpatialHash
+from projectiles import Projectiles
+from particles import Particles
 import random
 import game
 
 
 class Chunks():
-    __slots__ = ("list", "entities")
+    __slots__ = ("list", "entities", "types", "spatial", "projectiles", "particles", "window", "unloaded")
     def __init__(self) -> None:
         self.list = {}
         self.entities: set[Object] = set()  # The currently loaded entities
+        self.types: dict[type, set[Object]] = {}  # The currently loaded entities, grouped by their class
+        self.spatial = SpatialHash()  # The currently loaded Objects, for collision and proximity queries
+        self.projectiles = Projectiles()  # The bullets, they are not saved
+        self.particles = Particles()  # Every ParticleSystem, they are not chunk entities
+        self.window: tuple[int, int, int, int] | None = None  # The square of loaded chunk coords (min x, min y, max x, max y)
+        self.unloaded: set[Object] = set()  # Entities that have left the loaded chunks since the last update
 
         self.create_initial_chunks()
 
+    def __getstate__(self) -> tuple[None, dict]:
+        # Only the chunks and particles are saved, the loaded entities are rebuilt on the first update
+        return None, {"list": self.list, "particles": self.particles}
+
+    def __setstate__(self, state: tuple[None, dict]) -> None:
+        self.list = state[1]["list"]
+        self.particles = state[1]["particles"]
+        self.entities = set()
+        self.types = {}
+        self.spatial = SpatialHash()
+        self.projectiles = Projectiles()
+        self.window = None
+        self.unloaded = set()
+
     def create_initial_chunks(self) -> None:
         for y in range(-game.SPAWN_SIZE, game.SPAWN_SIZE):
             for x in range(-game.SPAWN_SIZE, game.SPAWN_SIZE):
@@ -27,27 +51,66 @@ class Chunks():
         # Turn coordinates into chunk coordinates
         chunk_coords = player.position // game.CHUNK_SIZE
 
-        # Unload all entities
-        original_entities = self.entities
-        self.entities = set()
-
-        # Loop through chunks in square around player's position
-        for y in range(chunk_coords.y - game.LOAD_DISTANCE, chunk_coords.y + game.LOAD_DISTANCE + 1):
-            for x in range(chunk_coords.x - game.LOAD_DISTANCE, chunk_coords.x + game.LOAD_DISTANCE + 1):
+        # Square of chunks around player's position
+        window = (chunk_coords.x - game.LOAD_DISTANCE, chunk_coords.y - game.LOAD_DISTANCE,
+                  chunk_coords.x + game.LOAD_DISTANCE, chunk_coords.y + game.LOAD_DISTANCE)
+
+        # Only the chunks that have entered or left the square need to be loaded or unloaded
+        if window != self.window:
+            original_window = self.window
+            self.window = window
+
+            # Unload entities in chunks that have left the square
+            if original_window:
+                for position in window_difference(original_window, window):
+                    for entity in self.list[position].entities:
+                        self.unload_entity(entity)
+                        self.unloaded.add(entity)
+
+            # Load entities in chunks that have entered the square
+            # If chunk hasn't been created, then create a new chunk
+            for position in window_difference(window, original_window):
+                for entity in self.get_chunk_from_coord(position).entities:
+                    self.load_entity(entity)
+
+        unloaded = self.unloaded
+        self.unloaded = set()
+        for entity in unloaded:
+            if entity not in self.entities and hasattr(entity, "unload"):
+                entity.unload()
 
-                # If chunk hasn't been created, then create a new chunk
-                position = (x, y)
-                if position not in self.list:
-                    chunk = Chunk(Vector(position[0], position[1]))
-                    self.list[position] = chunk
-                    chunk.generate()
+    def load_entity(self, entity: Object) -> None:
+        """Adds the entity to the loaded entities, NOTE: doesn't add the entity to a chunk"""
+        if entity not in self.entities:
+            self.entities.add(entity)
+            self.types.setdefault(type(entity), set()).add(entity)
 
-                # Load entities in loaded chunks
-                self.entities.update(self.get_chunk_from_coord(position).entities)
+            if isinstance(entity, Object):
+                self.spatial.insert(entity)
 
-        for entity in original_entities.difference(self.entities):
-            if hasattr(entity, "unload"):
-                entity.unload()
+    def unload_entity(self, entity: Object) -> None:
+        """Removes the entity from the loaded entities, NOTE: doesn't remove the entity from it's chunk"""
+        if entity in self.entities:
+            self.entities.remove(entity)
+            self.types[type(entity)].remove(entity)
+
+            if isinstance(entity, Object):
+                self.spatial.remove(entity)
+
+    def get_entities(self, *types: type, exclude: tuple[type, ...] = ()) -> list[Object]:
+        """Returns a list of the loaded entities that are an instance of one of `types`, or every loaded entity if no types are given
+        \nEntities that are an instance of one of `exclude` are left out"""
+        entities = []
+        for entity_type, loaded_entities in self.types.items():
+            if (not types or issubclass(entity_type, types)) and not issubclass(entity_type, exclude):
+                entities.extend(loaded_entities)
+        return entities
+
+    def is_loaded(self, position: tuple[int, int]) -> bool:
+        """Returns True if the chunk at chunk_coord `position` is loaded"""
+        return (self.window is not None and
+                self.window[0] <= position[0] <= self.window[2] and
+                self.window[1] <= position[1] <= self.window[3])
 
     def get_chunk(self, arg: tuple[int, int] | Object) -> Chunk:
         """Returns the chunk, arg can be a chunk_coord or an object"""
@@ -93,14 +156,18 @@ class Chunks():
 
     def add_entity(self, entity: Object) -> None:
 
-        self.get_chunk_from_entity(entity).entities.add(entity)
+        chunk = self.get_chunk_from_entity(entity)
+        chunk.entities.add(entity)
+
+        if self.is_loaded((chunk.position.x, chunk.position.y)):
+            self.load_entity(entity)
 
     def remove_entity(self, entity: Object) -> None:
 
         self.get_chunk_from_entity(entity).entities.remove(entity)
 
-        if entity in self.entities:
-            self.entities.remove(entity)
+        self.unload_entity(entity)
+        self.unloaded.discard(entity)
 
     # optimized
     def move_entity(self, entity: Entity, delta_time: float) -> None:
@@ -110,8 +177,10 @@ class Chunks():
         new_chunk_pos = (int(entity.position.x // game.CHUNK_SIZE), int(entity.position.y // game.CHUNK_SIZE))
 
         if new_chunk_pos != original_chunk_pos:
-            self.get_chunk_from_coord(original_chunk_pos).entities.remove(entity)
-            self.get_chunk_from_coord(new_chunk_pos).entities.add(entity)
+            self.change_chunk(entity, original_chunk_pos, new_chunk_pos)
+
+        if entity in self.spatial.bounds:
+            self.spatial.move(entity)
 
     # optimized
     def set_position(self, entity: Entity, position: Vector) -> None:
@@ -121,8 +190,39 @@ class Chunks():
         new_chunk_pos = (int(entity.position.x // game.CHUNK_SIZE), int(entity.position.y // game.CHUNK_SIZE))
 
         if new_chunk_pos != original_chunk_pos:
-            self.get_chunk_from_coord(original_chunk_pos).entities.remove(entity)
-            self.get_chunk_from_coord(new_chunk_pos).entities.add(entity)
+            self.change_chunk(entity, original_chunk_pos, new_chunk_pos)
+
+        if entity in self.spatial.bounds:
+            self.spatial.move(entity)
+
+    def change_chunk(self, entity: Object, original_chunk_pos: tuple[int, int], new_chunk_pos: tuple[int, int]) -> None:
+        """Moves the entity to a different chunk, loading or unloading it if it has crossed the edge of the loaded chunks"""
+        self.get_chunk_from_coord(original_chunk_pos).entities.remove(entity)
+        self.get_chunk_from_coord(new_chunk_pos).entities.add(entity)
+
+        if self.is_loaded(new_chunk_pos):
+            self.load_entity(entity)
+
+        elif entity in self.entities:
+            self.unload_entity(entity)
+            self.unloaded.add(entity)
+
+
+
+def window_difference(window: tuple[int, int, int, int], other: tuple[int, int, int, int] | None) -> Iterator[tuple[int, int]]:
+    """Yields the chunk coords inside `window` that are not inside `other`"""
+    min_x, min_y, max_x, max_y = window
+
+    for y in range(min_y, max_y + 1):
+
+        # Whole row is outside of other
+        if other is None or y < other[1] or y > other[3]:
+            yield from ((x, y) for x in range(min_x, max_x + 1))
+
+        # Only the ends of the row are outside of other
+        else:
+            yield from ((x, y) for x in range(min_x, min(max_x, other[0] - 1) + 1))
+            yield from ((x, y) for x in range(max(min_x, other[2] + 1), max_x + 1))
 
 
 
@@ -38,19 +38,16 @@ def add_score(score=100):
 
 def kill(type: str = ""):
     if type == "":
-        for entity in game.CHUNKS.entities.copy():
-            if isinstance(entity, Entity) and not isinstance(entity, Player_Ship):
-                game.CHUNKS.remove_entity(entity)
+        for entity in game.CHUNKS.get_entities(Entity, exclude=(Player_Ship,)):
+            game.CHUNKS.remove_entity(entity)
 
     elif type == "neutral":
-        for entity in game.CHUNKS.entities.copy():
-            if isinstance(entity, Neutral_Ship):
-                game.CHUNKS.remove_entity(entity)
+        for entity in game.CHUNKS.get_entities(Neutral_Ship):
+            game.CHUNKS.remove_entity(entity)
 
     elif type == "enemy":
-        for entity in game.CHUNKS.entities.copy():
-            if isinstance(entity, Enemy_Ship):
-                game.CHUNKS.remove_entity(entity)
+        for entity in game.CHUNKS.get_entities(Enemy_Ship):
+            game.CHUNKS.remove_entity(entity)
 
 
 def teleport(position: tuple[float, float]):
@@ -5,8 +5,22 @@ import math
 
 
 
+DAMAGE_MERGE_RADIUS = 50  # Hits closer than this to a recent damage effect add to it, rather than making a new one
+DAMAGE_MERGE_TIME = 0.2  # How long (in seconds) a damage effect can be added to
+
 def damage(position, damage):
-    particles.ParticleSystem(position, start_size=3, max_start_size=5, end_size=1, colour=(200, 0, 0), max_colour=(255, 160, 0), duration=None, lifetime=0.4, frequency=int(30*damage+1), speed=240, speed_variance=80)
+    count = int(30*damage+1)
+    if not game.CHUNKS.particles.burst_budget:
+        return
+
+    # Rapid hits (e.g. the laser, which damages every frame) share a particle system
+    particle_system = game.CHUNKS.particles.get_recent("damage", position, DAMAGE_MERGE_RADIUS, DAMAGE_MERGE_TIME)
+    if particle_system:
+        particle_system.burst(position, count)
+        return
+
+    particle_system = particles.ParticleSystem(position, start_size=3, max_start_size=5, end_size=1, colour=(200, 0, 0), max_colour=(255, 160, 0), duration=None, lifetime=0.4, frequency=count, speed=240, speed_variance=80)
+    game.CHUNKS.particles.add_recent("damage", particle_system)
 
 def explosion(position):
     particles.ParticleSystem(position, start_size=10, max_start_size=35, end_size=2, colour=(200, 0, 0), max_colour=(255, 160, 0), bloom=0.6, duration=None, lifetime=0.5, frequency=20, speed=220, speed_variance=100)
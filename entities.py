@@ -1,4 +1,6 @@
 from objects import Vector, Object, Entity
+from sprites import Cache, get_mask, get_distance_field, get_surface_bytes, get_zoom_bucket, ZOOM_STEPS
+from spatial import get_entry_time
 from weapons import Blaster
 import effects
 import images
@@ -9,7 +11,27 @@ import pygame
 
 
 
+SHIELD_ALPHA_STEPS = 32  # Number of transparency levels of the shield ring, from empty to full shield
+SHIELD_CACHE_BYTES = 8 * 1024 * 1024  # Memory limit of the shield ring cache
+shield_images = Cache("Shields", SHIELD_CACHE_BYTES, get_surface_bytes)
+
+def get_shield_image(zoom: float, alpha_step: int) -> pygame.Surface:
+    """Returns the ring drawn around shielded ships, scaled to the nearest zoom bucket"""
+    zoom_bucket = get_zoom_bucket(zoom)
+
+    def create() -> pygame.Surface:
+        scale = 2 ** (zoom_bucket / ZOOM_STEPS)
+        surf = pygame.Surface((60*scale, 60*scale), flags=pygame.SRCALPHA)
+        pygame.draw.circle(surf, (34, 130, 240, alpha_step / SHIELD_ALPHA_STEPS * 255), (30*scale, 30*scale), 30*scale, width=round(2*scale))
+        return surf
+
+    return shield_images.get((zoom_bucket, alpha_step), create)
+
+
+
 class Ship(Entity):
+    hittable_by = game.PLAYER | game.NEUTRAL | game.ENEMY | game.STATION | game.EXPLOSION
+
     def __init__(self, position: Vector, velocity: Vector, max_speed, rotation=0, weapon=Blaster, health=1, shield=0, armour=0, shield_delay=1, shield_recharge=1, image=lambda: images.DEFAULT) -> None:
         super().__init__(position, velocity, rotation, image)
 
@@ -90,15 +112,17 @@ class Ship(Entity):
 
         # Draw shield around ship
         if self.shield:
-            surf = pygame.Surface((60*game.ZOOM, 60*game.ZOOM), flags=pygame.SRCALPHA)
-            alpha = (self.shield / self.max_shield) * 255 # alpha value depends on current shield percentage
-            pygame.draw.circle(surf, (34, 130, 240, alpha), (30*game.ZOOM, 30*game.ZOOM), 30*game.ZOOM, width=round(2*game.ZOOM))
-            pos = ((self.position - focus_point) * game.ZOOM + game.CENTRE_POINT) - 30*game.ZOOM
-            win.blit(surf, pos.to_tuple())
+            alpha_step = min(math.ceil(self.shield / self.max_shield * SHIELD_ALPHA_STEPS), SHIELD_ALPHA_STEPS) # alpha value depends on current shield percentage
+            surf = get_shield_image(game.ZOOM, alpha_step)
+            radius = surf.get_width()/2
+            win.blit(surf, ((self.position.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x - radius,
+                            (self.position.y - focus_point.y) * game.ZOOM + game.CENTRE_POINT.y - radius))
 
 
 
 class Asteroid(Object):
+    hittable_by = game.PLAYER | game.NEUTRAL | game.ENEMY | game.STATION
+
     def __init__(self, position, image=None) -> None:
 
         # Generate random asteroid image
@@ -112,38 +136,32 @@ class Asteroid(Object):
         self.image = pygame.transform.rotate(self.image, math.degrees(self.rotation))
         self.mask = pygame.mask.from_surface(self.image)
 
-        self.previous_delta_time = 1
+        # Make the distance field of the asteroid's image now, rather than on the first collision
+        get_distance_field(self.load_image())
 
     def __setstate__(self, state):
         super().__setstate__(state)
         self.image = pygame.transform.rotate(self.image, math.degrees(self.rotation))
-        self.scaled_image = pygame.transform.rotate(self.scaled_image, math.degrees(self.rotation))
         self.mask = pygame.mask.from_surface(self.image)
+        get_distance_field(self.load_image())
 
     def update(self, delta_time):
         super().update(delta_time)
 
-        chunk_pos = self.position // game.CHUNK_SIZE
-
-        for y in range(chunk_pos.y-1, chunk_pos.y+2):
-            for x in range(chunk_pos.x-1, chunk_pos.x+2):
-
-                for entity in game.CHUNKS.get_chunk((x, y)).entities.copy():
-
-                    if isinstance(entity, Ship):
-                        asteroid_collision(self, entity)
+        for entity in game.CHUNKS.spatial.query_radius(self.position, self.radius, (Ship, Bullet)):
 
-                    elif isinstance(entity, Bullet):
-                        entity_mask = pygame.mask.from_surface(entity.image)
+            if isinstance(entity, Ship):
+                asteroid_collision(self, entity)
 
-                        x_offset = (entity.position.x - entity.image.get_width()/2) - (self.position.x - self.image.get_width()/2)
-                        y_offset = (entity.position.y - entity.image.get_height()/2) - (self.position.y - self.image.get_height()/2)
+            else:
+                entity_mask = get_mask(entity.image)
 
-                        if self.mask.overlap(entity_mask, (x_offset, y_offset)):
-                            entity.unload() # if bullet collides with asteroid then destroy bullet
-                            effects.damage(entity.position, entity.damage)
+                x_offset = (entity.position.x - entity.image.get_width()/2) - (self.position.x - self.image.get_width()/2)
+                y_offset = (entity.position.y - entity.image.get_height()/2) - (self.position.y - self.image.get_height()/2)
 
-        self.previous_delta_time = delta_time
+                if self.mask.overlap(entity_mask, (x_offset, y_offset)):
+                    entity.unload() # if bullet collides with asteroid then destroy bullet
+                    effects.damage(entity.position, entity.damage)
 
 
 
@@ -151,52 +169,39 @@ def asteroid_collision(asteroid: Asteroid, entity: Entity):
     """
     Check if entity overlapping with asteroid
     If overlapping:
-        Move entity backwards
-        If still overlapping:
-            Move the entity out 1 unit at a time until not overlapping
-        Rotate entity velocity so that it is reflected off the tangent to the asteroid
+        Look up how far the entity is from the asteroid's surface, and the surface normal, in the asteroid's distance field
+        Push the entity out along the normal until it's bounding circle is clear of the asteroid
+        Reflect entity velocity off the surface
         Damage entity and create damage particle effect
     """
-    entity_mask = pygame.mask.from_surface(entity.image)
+    # Mask of the entity's image at it's current rotation
+    entity_mask = get_mask(entity.image, entity.rotation)
+    width, height = entity_mask.get_size()
 
-    x_offset = (entity.position.x - entity.image.get_width()/2) - (asteroid.position.x - asteroid.image.get_width()/2)
-    y_offset = (entity.position.y - entity.image.get_height()/2) - (asteroid.position.y - asteroid.image.get_height()/2)
+    x_offset = (entity.position.x - width/2) - (asteroid.position.x - asteroid.image.get_width()/2)
+    y_offset = (entity.position.y - height/2) - (asteroid.position.y - asteroid.image.get_height()/2)
 
     if asteroid.mask.overlap(entity_mask, (x_offset, y_offset)):
 
-        game.CHUNKS.move_entity(entity, -asteroid.previous_delta_time)  # Move the entity backwards out of the asteroid
-
-        # Check if entity still in asteroid
-        x_offset = (entity.position.x - entity.image.get_width()/2) - (asteroid.position.x - asteroid.image.get_width()/2)
-        y_offset = (entity.position.y - entity.image.get_height()/2) - (asteroid.position.y - asteroid.image.get_height()/2)
-
-        if asteroid.mask.overlap(entity_mask, (x_offset, y_offset)):
-            # Move entity out of Asteroid if entity is still in Asteroid
-            # This ensures that the entity is definitly outside of the asteroid by moving the entity 1 game unit at a time
+        distance_field = get_distance_field(asteroid.load_image())
 
-            escape_vector = entity.position - asteroid.position
-            escape_vector.set_magnitude(1)  # Normalize vector
-            original_velocity = entity.velocity.copy()
-            entity.velocity = escape_vector
+        # Move the entity out of the asteroid along the normal, by how far it's bounding circle is inside (with half a sample of leeway)
+        # One push is enough unless the entity is deep inside a curved part of the asteroid
+        for _ in range(4):
 
-            while True:
-                game.CHUNKS.move_entity(entity, 1)
+            # The distance field is of the unrotated asteroid image, so the entity's position is rotated into it
+            distance, normal_x, normal_y = distance_field.get((entity.position - asteroid.position).get_rotated(-asteroid.rotation))
+            normal = Vector(normal_x, normal_y).get_rotated(asteroid.rotation)
 
-                x_offset = (entity.position.x - entity.image.get_width()/2) - (asteroid.position.x - asteroid.image.get_width()/2)
-                y_offset = (entity.position.y - entity.image.get_height()/2) - (asteroid.position.y - asteroid.image.get_height()/2)
+            depth = entity.radius + distance_field.step / 2 - distance
+            if depth <= 0:
+                break
+            game.CHUNKS.set_position(entity, entity.position + normal * depth)
 
-                if not asteroid.mask.overlap(entity_mask, (x_offset, y_offset)):
-                    break
-
-            entity.velocity = original_velocity
-
-        vector_to_asteroid = asteroid.position - entity.position
-        tangent_to_asteroid = vector_to_asteroid.get_rotated(math.pi/2)  # Rotate 90 degrees
-        tangent_angle = tangent_to_asteroid.get_angle()
-        entity_angle = entity.velocity.get_angle()
-        angle_difference = entity_angle - tangent_angle
-        entity_rotation = 2 * angle_difference  # 1 angle difference makes it go along normal, another difference reflects it through normal
-        entity.velocity.rotate(entity_rotation)
+        # Reflect the velocity through the surface, if the entity is moving into it
+        speed_into_surface = entity.velocity.x * normal.x + entity.velocity.y * normal.y
+        if speed_into_surface < 0:
+            entity.velocity -= normal * (2 * speed_into_surface)
 
         if entity.velocity:
             entity.velocity.set_magnitude(entity.velocity.magnitude()*0.8)  # Set speed to 80%
@@ -256,7 +261,6 @@ class Scrap(Pickup):
 
 
 # To prevent circular import error
-from aiship import Enemy_Ship, Neutral_Ship
 from station import StationCannon
 
 
@@ -272,6 +276,7 @@ class Bullet(Entity):
         self.z = 1  # Ensure bullets are seen above ships
 
     def update(self, delta_time):
+        start = self.position
         super().update(delta_time)
 
         self.start_time += delta_time
@@ -279,33 +284,31 @@ class Bullet(Entity):
         if self.start_time > self.lifetime:
             game.CHUNKS.remove_entity(self)
         else:
-            # Check if bullet is near to any entities in it's chunk
-            # Make sure entity is not on same alliance as self.ship
-            # Then destroy entity and bullet
-            for entity in game.CHUNKS.get_chunk(self).entities:
-
-                if isinstance(entity, Ship) and entity != self.ship:
-                    if not (
-                        (isinstance(entity, Enemy_Ship) and isinstance(self.ship, Enemy_Ship)) or
-                        (isinstance(entity, Neutral_Ship) and isinstance(self.ship, Neutral_Ship))):
-                        if (entity.shield and self.distance_to(entity) < 35) or (not entity.shield and self.distance_to(entity) < 29):
-                            entity.damage(self.damage, self.ship)
-                            game.CHUNKS.remove_entity(self)
-                            break
-
-                elif isinstance(entity, Missile):
-                    if not isinstance(self.ship, Enemy_Ship):
-                        if self.distance_to(entity) < 20:
-                            entity.explode(entity.explode_radius)
-                            game.CHUNKS.remove_entity(self)
-                            break
-
-                elif isinstance(entity, StationCannon) and not isinstance(self.ship, StationCannon):
-                    if not isinstance(self.ship, Enemy_Ship):
-                        if self.distance_to(entity) < 20:
-                            entity.damage(self.damage, self.ship)
-                            game.CHUNKS.remove_entity(self)
-                            break
+            # Check if the bullet's path this frame passes near to any entities
+            # Make sure self.ship's faction can hit the entity
+            # Then damage the first entity along the path and destroy bullet
+            faction = self.ship.faction if self.ship else game.NEUTRAL
+            hits = []
+            for entity in game.CHUNKS.spatial.query_segment(start, self.position, (Ship, Missile, StationCannon), 35):
+
+                if entity.hittable_by & faction:
+                    if isinstance(entity, Ship):
+                        radius = 35 if entity.shield else 29
+                    else:
+                        radius = 20
+
+                    time = get_entry_time(start, self.position, entity.position, radius)
+                    if time is not None:
+                        hits.append((time, entity))
+
+            if hits:
+                time, entity = min(hits, key=lambda hit: hit[0])
+
+                if isinstance(entity, Missile):
+                    entity.explode(entity.explode_radius)
+                else:
+                    entity.damage(self.damage, self.ship)
+                game.CHUNKS.remove_entity(self)
 
 
     def unload(self):
@@ -314,6 +317,9 @@ class Bullet(Entity):
 
 
 class Missile(Entity):
+    faction = game.ENEMY
+    hittable_by = game.PLAYER | game.NEUTRAL | game.STATION
+
     def __init__(self, position, velocity, rotation=0, max_speed=1000, max_rotation_speed=3, explode_distance=100, explode_radius=150, explode_damage=5, explode_countdown=0.1, image=lambda: images.MISSILE) -> None:
         super().__init__(position, velocity, rotation, image)
 
@@ -361,18 +367,15 @@ class Missile(Entity):
         self.explode(self.explode_radius)
 
     def explode(self, radius):
-        entity_list = game.CHUNKS.entities
-
-        # Have to create separate list otherwise the set game.CHUNKS.entities will change size while iterating though it
+        # Have to create separate list otherwise the loaded entities will change size while iterating though them
         entities_to_damage = []
         damage_values = []
 
-        for entity in entity_list:
-            if isinstance(entity, Ship):
-                distance = entity.distance_to(self)
-                if distance < radius:
-                    entities_to_damage.append(entity)
-                    damage_values.append(1 - distance / self.explode_radius)
+        for entity in game.CHUNKS.spatial.query_radius(self.position, radius):
+            distance = entity.distance_to(self)
+            if entity.hittable_by & game.EXPLOSION and distance < radius:
+                entities_to_damage.append(entity)
+                damage_values.append(1 - distance / self.explode_radius)
 
         for i, entity in enumerate(entities_to_damage):
             entity.damage(self.explode_damage * damage_values[i])
@@ -11,6 +11,7 @@ Game constants are loaded from save at the start of a game
 from __future__ import annotations
 import os
 import json
+import numpy as np
 import pygame
 
 pygame.init()
@@ -29,13 +30,15 @@ WIDTH = display_info.current_w
 HEIGHT = display_info.current_h
 LOAD_DISTANCE = 5  # Chunks loaded from player
 ENTITY_CULLING = False
+PARTICLE_CAP = 8  # Thousands of particles that can be alive at once
 
 settings = [
     "WIDTH",
     "HEIGHT",
     "FULLSCREEN",
     "LOAD_DISTANCE",
-    "ENTITY_CULLING"
+    "ENTITY_CULLING",
+    "PARTICLE_CAP"
 ]
 
 def save_settings():
@@ -92,8 +95,20 @@ KILL = 0
 COLLECT = 1
 UPGRADE = 2
 
+# Factions, bit flags
+# Every entity class has a faction, and a hittable_by bitmask of the factions that can damage it
+PLAYER = 1
+NEUTRAL = 2
+ENEMY = 4
+STATION = 8  # Station cannons
+EXPLOSION = 16  # Missile explosions
+
 CHUNK_SIZE = 600  # How big each chunk is
 
+CELL_SIZE = 100  # How big each spatial hash cell is, used for collision and proximity queries
+
+PROJECTILE_CAPACITY = 1024  # Starting number of bullets the projectile arrays can hold, doubles when full
+
 SPAWN_SIZE = 4
 
 ENTITY_DICT = {"Enemy_Ship": "Enemy Ship", "Mother_Ship": "Mother Ship", "Drone_Enemy": "Drone Ship", "Missile_Ship": "Missile Ship"}
@@ -209,6 +224,10 @@ class Pickler(dill.Pickler):
     def reducer_override(self, obj):
         """Remove Surface or Mask as they cannot be pickled"""
 
+        # Numpy arrays can be pickled, and some of their attributes raise an error when they're accessed
+        if isinstance(obj, np.ndarray):
+            return NotImplemented
+
         for name in dir(obj):
             if isinstance(getattr(obj, name), (pygame.Surface, pygame.Mask)):
                 delattr(obj, name)
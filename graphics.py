@@ -1,91 +1,86 @@
 """
 This file contains functions to draw graphics
-This includes: get_entities_to_draw, draw_chunks, draw_stars
+This includes: RenderQueue, get_entities_to_draw, draw_chunks, draw_stars
 """
 
 from objects import Object
 import game
 from game import *
-from random import randint
+import numpy as np
 import pygame
 
 
 
-def get_entities_to_draw() -> list[Object]:
-    """Returns the entities that are visible on the screen
-    \nSorts the order to draw entities based on their 'z value'"""
+class RenderQueue():
+    """
+    Collects the blits of everything drawn in the world, so that they are drawn together with one fblits call
 
-    # TODO: Have a different radius for width and height of screen
-    # TODO: Optimize culling more, check both axis
-    # NOTE: Aggressive entity culling currently experimental
+    It is drawn to like a Surface, with blit and fblits
+    Anything else (e.g. pygame.draw) must be drawn to get_surface(), which draws the queued blits first so the order is kept
+    """
+    __slots__ = ("surface", "blits")
+    def __init__(self, surface: pygame.Surface) -> None:
+        self.surface = surface
+        self.blits: list[tuple[pygame.Surface, tuple[float, float]]] = []
 
-    # Get number of chunks until going off the screen
-    radius = int((WIDTH / game.ZOOM) / (CHUNK_SIZE * 2))  # Ensure every entity that can be seen is drawn
+    def blit(self, source: pygame.Surface, position: tuple[float, float]) -> None:
+        self.blits.append((source, position))
+
+    def fblits(self, blits) -> None:
+        self.blits.extend(blits)
+
+    def get_size(self) -> tuple[int, int]:
+        return self.surface.get_size()
+
+    def get_clip(self) -> pygame.Rect:
+        return self.surface.get_clip()
+
+    def get_surface(self) -> pygame.Surface:
+        """Draws the queued blits, and returns the surface to draw to"""
+        self.flush()
+        return self.surface
 
-    centre = game.CHUNKS.get_chunk(game.player).position
+    def flush(self) -> None:
+        self.surface.fblits(self.blits)
+        self.blits.clear()
+
+
+
+DRAW_MARGIN = 40  # How far (in world units) things drawn around an entity can go outside it's bounding circle, e.g. shields
+
+# optimized
+def get_entities_to_draw() -> list[Object]:
+    """Returns the entities that are visible on the screen
+    \nThe entities are ordered by their 'z value', so higher z values are drawn on top"""
 
-    entities: set[Object] = set()
+    # The screen in the world, with a margin
+    half_width = WIDTH / game.ZOOM / 2 + DRAW_MARGIN
+    half_height = HEIGHT / game.ZOOM / 2 + DRAW_MARGIN
+    rect = (game.player.position.x - half_width, game.player.position.y - half_height, half_width*2, half_height*2)
 
-    # Aggresive, only draw if player can see entity
+    # Aggresive, only draw if the entity's bounding square overlaps the screen
     if game.ENTITY_CULLING:
-        # XXXXX
-        # XXXXX
-        # OO@OO
-        # XXXXX
-        # XXXXX
-
-        # Chunks that are definitely in the screen
-        for y in range(centre.y - radius + 1, centre.y + radius):
-            for x in range(centre.x - radius + 1, centre.x + radius):
-
-                chunk = game.CHUNKS.get_chunk((x, y))
-                entities.update(chunk.entities)
-
-        # Get visible entities around edge of the screen
-        for x in range(centre.x - radius - 1, centre.x + radius + 2):
-            for y in range(centre.y + radius, centre.y + radius + 2):
-                chunk = game.CHUNKS.get_chunk((x, y))
-                for entity in chunk.entities:
-                    if not hasattr(entity, "size") or (game.player.position.y - entity.position.y - entity.size.y/2) * game.ZOOM < HEIGHT/2:
-                        entities.add(entity)
-
-        for x in range(centre.x - radius - 1, centre.x + radius + 2):
-            for y in range(centre.y - radius - 1, centre.y - radius + 1):
-                chunk = game.CHUNKS.get_chunk((x, y))
-                for entity in chunk.entities:
-                    if not hasattr(entity, "size") or (entity.position.y - entity.size.y/2 - game.player.position.y) * game.ZOOM < HEIGHT/2:
-                        entities.add(entity)
-
-        for y in range(centre.y - radius + 1, centre.y + radius):
-            for x in range(centre.x + radius, centre.x + radius + 2):
-                chunk = game.CHUNKS.get_chunk((x, y))
-                for entity in chunk.entities:
-                    if not hasattr(entity, "size") or (entity.position.x - entity.size.x/2 - game.player.position.x) * game.ZOOM < WIDTH/2:
-                        entities.add(entity)
-
-        for y in range(centre.y - radius + 1, centre.y + radius):
-            for x in range(centre.x - radius - 1, centre.x - radius + 1):
-                chunk = game.CHUNKS.get_chunk((x, y))
-                for entity in chunk.entities:
-                    if not hasattr(entity, "size") or (game.player.position.x - entity.position.x - entity.size.x/2) * game.ZOOM < WIDTH/2:
-                        entities.add(entity)
-
-    # Passive, draw all entities in chunks around screen
-    else:
-        radius += 2
-        for y in range(centre.y - radius, centre.y + radius + 1):
-            for x in range(centre.x - radius, centre.x + radius + 1):
+        entities = game.CHUNKS.spatial.query_aabb(rect)
 
-                chunk = game.CHUNKS.get_chunk((x, y))
-                entities.update(chunk.entities)
+    # Passive, draw all entities in the spatial hash cells that overlap the screen
+    else:
+        x, y, width, height = rect
+        entities = game.CHUNKS.spatial.get_cell_entities(x, y, x + width, y + height)
 
-    return sorted(entities, key=z_sort)
+    # Bullets fired by weapons are all drawn together, as are the particles in each z layer
+    layers: dict[int, list[Object]] = {game.CHUNKS.projectiles.z: [game.CHUNKS.projectiles]}
+    for particle_layer in game.CHUNKS.particles.get_layers():
+        layers.setdefault(particle_layer.z, []).append(particle_layer)
 
+    # The entities are put into a list for each z value, so only the z values need sorting
+    for entity in entities:
+        layer = layers.get(entity.z)
+        if layer is None:
+            layers[entity.z] = [entity]
+        else:
+            layer.append(entity)
 
-def z_sort(entity: Object) -> int:
-    if hasattr(entity, "z"):
-        return entity.z
-    return 0
+    return [entity for z in sorted(layers) for entity in layers[z]]
 
 
 
@@ -116,25 +111,28 @@ def draw_chunks() -> None:
 
 
 
-# Generate list of 6 layers, each layer has 100 coordinates of stars
+# Generate 6 layers, each layer has 100 coordinates of stars
+# The stars wrap around an area STAR_MARGIN bigger than the screen on every side, so they don't pop in at the edge
 star_speed = 0.005
 layers = 6
-stars: list[list[list]] = list()
-for _ in range(layers):
-    layer: list[list] = list()
-    for _ in range(100):
-        layer.append([randint(-10, WIDTH + 10), randint(-10, HEIGHT + 10)])
-    stars.append(layer)
+stars_per_layer = 100
+STAR_MARGIN = 100
+random_generator = np.random.default_rng()
+
+def get_star_area() -> np.ndarray:
+    return np.array((WIDTH + STAR_MARGIN*2, HEIGHT + STAR_MARGIN*2))
+
+stars = random_generator.random((layers, stars_per_layer, 2)) * get_star_area()
+# Sometimes layer is incremented by 1 (layer + 1)
+# This is because the smallest layer should still have a speed / size > 0
+star_speeds = (np.arange(layers) + 1)[:, None, None] * star_speed
 
 def update_graphics_screen_size() -> None:
     global WIDTH, HEIGHT, stars
+    # The stars are stretched to the new screen size, instead of being generated again
+    old_area = get_star_area()
     WIDTH, HEIGHT = game.WIDTH, game.HEIGHT
-    stars = list()
-    for _ in range(layers):
-        layer: list[list] = list()
-        for _ in range(100):
-            layer.append([randint(-10, WIDTH + 10), randint(-10, HEIGHT + 10)])
-        stars.append(layer)
+    stars = stars / old_area * get_star_area()
 
 
 # Generate 6 star images, from smallest to largest
@@ -148,6 +146,8 @@ for layer in range(layers):
     surf.set_colorkey((0, 0, 0))
     circles.append(surf)
 
+star_images = [circles[layer] for layer in range(layers) for _ in range(stars_per_layer)]  # The image of each star, in the same order as stars
+
 draw_circles = WIN.fblits
 
 
@@ -155,40 +155,11 @@ draw_circles = WIN.fblits
 def draw_stars() -> None:
     # Layered Stars
     # Bigger stars move more
+    global stars
 
-    star_velocity = (game.LAST_PLAYER_POS - game.player.position) * star_speed
-
-    for layer in range(layers):
-
-        # Sometimes layer is incremented by 1 (layer + 1)
-        # This is because the smallest layer should still have
-        # a speed / size > 0
-
-        # Move each star opposite direction to player
-        shiftx = star_velocity.x * (layer+1)
-        shifty = star_velocity.y * (layer+1)
-
-        for star in stars[layer]:
-            star[0] += shiftx
-            star[1] += shifty
-
-            # If the star is outside of the screen, remove it
-            # 100 is the number of pixels a star can go outside the screen before being destroyed
-            if star[0] < -100:
-                star[0] = WIDTH + layer
-                star[1] = randint(-layer, HEIGHT+layer)
-
-            elif star[0] > WIDTH + 100:
-                star[0] = -layer
-                star[1] = randint(-layer, HEIGHT+layer)
-
-            elif star[1] < -100:
-                star[0] = randint(-layer, WIDTH+layer)
-                star[1] = HEIGHT+layer
-
-            elif star[1] > HEIGHT + 100:
-                star[0] = randint(-layer, WIDTH+layer)
-                star[1] = -layer
+    # Move every star opposite direction to player, wrapping around when it goes outside of the star area
+    star_velocity = game.LAST_PLAYER_POS - game.player.position
+    stars = (stars + star_speeds * (star_velocity.x, star_velocity.y)) % get_star_area()
 
-        # Draw stars
-        draw_circles([(circles[layer], pos) for pos in stars[layer]])
+    # Draw stars
+    draw_circles(zip(star_images, (stars.reshape(-1, 2) - STAR_MARGIN).tolist()))
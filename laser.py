@@ -1,10 +1,20 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from objects import Object, Vector
+from spatial import get_entry_time
+from sprites import get_mask
 import entities
-import station
+import sprites
 import game
 import math
+import numpy as np
 import pygame
 
+# This allows type hinting for RenderQueue, done this way to avoid circular import errors
+if TYPE_CHECKING:
+    from graphics import RenderQueue
+
+MAX_PROFILE_LENGTH = 2 ** 18  # Longest row of the middle of the laser beam, in pixels, only reached when the beam is close to horizontal
 
 
 class Laser():
@@ -32,73 +42,108 @@ class Laser():
             entity.damage(self.damage*self.delta_time, self.ship)
 
     def raycast(self) -> tuple[int, Object | None]:
+        """Returns the distance to the first entity the laser hits, and the entity (None if nothing is hit)"""
         self.max_range = game.PLAYER_LASER_RANGE  # assuming only player has a laser
         sin_rotation = math.sin(self.ship.rotation)
         cos_rotation = math.cos(self.ship.rotation)
-        x = self.ship.position.x - self.ship.image.get_height()/2 * sin_rotation
-        y = self.ship.position.y - self.ship.image.get_height()/2 * cos_rotation
-        chunk_x = None
-        chunk_y = None
-
-        for step in range(self.max_range):
-            x, y = x - sin_rotation, y - cos_rotation
-
-            if chunk_x != int(x // game.CHUNK_SIZE) or chunk_y != int(y // game.CHUNK_SIZE):
-                chunk_x = int(x // game.CHUNK_SIZE)
-                chunk_y = int(y // game.CHUNK_SIZE)
-
-                total_entities = []
-                nearby_entities: dict[Object, tuple[pygame.Surface, pygame.Rect]] = {}
-
-                for cy in range(chunk_y - 1, chunk_y + 2):
-                    for cx in range(chunk_x - 1, chunk_x + 2):
-                        total_entities.extend(game.CHUNKS.get_chunk_from_coord((cx, cy)).entities)
-
-                if self.ship in total_entities:
-                    total_entities.remove(self.ship)
-
-                for entity in total_entities:
-                    if (isinstance(entity, entities.Ship) or
-                    isinstance(entity, entities.Asteroid) or
-                    isinstance(entity, entities.Missile) or
-                    isinstance(entity, station.StationCannon)
-                    ):
-
-                        if isinstance(entity, entities.Asteroid):
-                            image = entity.image
-                        else:
-                            image = entity.rotated_image
-
-                        nearby_entities[entity] = image, image.get_rect()
-
-            # pos is a vector from entity to laser point
-            # it is then adjusted so the top left corner is (0, 0)
-            for entity, (image, rect) in nearby_entities.items():
-                pos = round(x - entity.position.x + rect[2]/2), round(y - entity.position.y + rect[3]/2)
-
-                if rect.collidepoint(pos) and image.get_at(pos)[3] == 255:  # Check for pixel at pos
-                    return step, entity
-
-        return step, None
+        start = Vector(self.ship.position.x - self.ship.image.get_height()/2 * sin_rotation,
+                       self.ship.position.y - self.ship.image.get_height()/2 * cos_rotation)
+        end = Vector(start.x - sin_rotation * self.max_range, start.y - cos_rotation * self.max_range)
+
+        # Entities whose bounding circle the laser passes through, ordered by the distance the laser enters the circle
+        candidates = []
+        for entity in game.CHUNKS.spatial.query_segment(start, end):
+            if entity is self.ship or not entity.hittable_by & self.ship.faction:
+                continue
+
+            time = get_entry_time(start, end, entity.position, entity.radius)
+            if time is not None:
+                candidates.append((time * self.max_range, entity))
+        candidates.sort(key=lambda candidate: candidate[0])
+
+        hit_distance = self.max_range
+        hit_entity = None
+        for entry_distance, entity in candidates:
+
+            # An entity that the laser enters after the closest hit so far can't be hit
+            if entry_distance >= hit_distance:
+                break
+
+            if isinstance(entity, entities.Asteroid):
+                mask = entity.mask
+            else:
+                mask = get_mask(entity.image, entity.rotation)
+            width, height = mask.get_size()
+
+            # Step along the part of the laser inside the bounding circle, checking the mask at each point
+            # Points are relative to the top left of the mask
+            x = start.x - entity.position.x + width/2
+            y = start.y - entity.position.y + height/2
+            exit_distance = min(hit_distance, entry_distance + 2 * entity.radius)
+            distance = math.floor(entry_distance)
+            while distance < exit_distance:
+                pixel = int(x - sin_rotation * distance), int(y - cos_rotation * distance)
+                if 0 <= pixel[0] < width and 0 <= pixel[1] < height and mask.get_at(pixel):
+                    hit_distance = distance
+                    hit_entity = entity
+                    break
+                distance += 1
+
+        return hit_distance, hit_entity
+
+    def draw_beam(self, win: pygame.Surface, start: Vector, length: float) -> None:
+        """Draws the beam on `win`, from `start` (on the screen) forwards for `length` pixels
+        \nThe beam is drawn one row of pixels at a time. The middle of each row is the middle row of the cached beam scaled to fit across
+        the row, and it's ends are rows of a cached disc, so nothing is rotated each frame and only the rows on the screen are drawn"""
+
+        zoom_bucket = sprites.get_zoom_bucket(game.ZOOM)
+        beam = sprites.tiles.get(("laser beam", zoom_bucket), lambda: create_beam(2 * round(55 * 2 ** (zoom_bucket / sprites.ZOOM_STEPS))))
+        width = beam.get_width()
+        radius = width // 2
+        end_disc = sprites.tiles.get(("laser end", zoom_bucket), lambda: create_beam_end(beam))
+
+        # Each row crosses the middle of the beam in `profile_length` pixels, which gets longer the closer the beam is to horizontal,
+        # so a beam very close to horizontal is turned slightly to keep it under MAX_PROFILE_LENGTH
+        direction = Vector(-math.sin(self.ship.rotation), -math.cos(self.ship.rotation))
+        if abs(direction.y) < width / MAX_PROFILE_LENGTH:
+            direction.y = math.copysign(width / MAX_PROFILE_LENGTH, direction.y)
+            direction.x = math.copysign(math.sqrt(1 - direction.y**2), direction.x)
+        across = Vector(-direction.y, direction.x)
+        profile_length = round(width / abs(across.x))
+        profile = sprites.tiles.get(("laser profile", zoom_bucket, profile_length), lambda: create_beam_profile(beam, profile_length))
+
+        # The ends of the glow reach half the light beam's width past the ends of the light beam
+        light_radius = width / 22
+        start = start + direction * light_radius
+        length = max(length - light_radius*2, 0)
+        end = start + direction * length
+
+        first_row = max(math.floor(min(start.y, end.y) - radius), 0)
+        last_row = min(math.ceil(max(start.y, end.y) + radius), win.get_height())
+        if first_row >= last_row:
+            return
 
-    def draw_beam(self) -> pygame.Surface:
-        beam_width = 10*game.ZOOM
-        glow_radius = 100*game.ZOOM
-        width, height = beam_width+glow_radius, self.range*game.ZOOM+glow_radius
-        surf = pygame.Surface((width, height), flags=pygame.SRCALPHA)
+        # The distance along the beam of pixel x in a row is direction.x * (x + 0.5) + the row's offset
+        rows = np.arange(first_row, last_row)
+        offsets_y = rows + 0.5 - start.y
+        offsets = direction.y * offsets_y - direction.x * start.x
 
-        # Draw beam glow
-        for step in range(int(glow_radius/4)+1):
-            step=step*2
-            pygame.draw.rect(surf, (40, 100, 150, (step/width)**1.3*510), (step, step, width-step*2, height-step*2), border_radius=round(width-step), width=3)
+        # Middle of the beam, the profile starts where the row is `radius` from the centre of the beam (the beam is symmetric)
+        profile_starts = np.rint(start.x + (-math.copysign(radius, across.x) - across.y * offsets_y) / across.x).astype(np.int64)
+        lows, highs = get_spans(direction.x, offsets, 0, length, np.maximum(profile_starts, 0), np.minimum(profile_starts + profile_length, win.get_width()))
+        blits = get_row_blits(profile, rows, lows, highs, profile_starts, np.zeros_like(rows))
 
-        # Draw light beam
-        pygame.draw.rect(surf, (81, 200, 252), (glow_radius/2, glow_radius/2, beam_width, self.range*game.ZOOM), border_radius=round(beam_width))
+        # Ends of the beam, the part of the start disc before the start and the part of the end disc after the end
+        for centre, span_start, span_end in ((start, None, 0), (end, length, None)):
+            disc_top = round(centre.y - radius)
+            disc_rows = slice(max(disc_top - first_row, 0), max(disc_top + width - first_row, 0))
+            disc_left = round(centre.x - radius)
+            lows, highs = get_spans(direction.x, offsets[disc_rows], span_start, span_end, max(disc_left, 0), min(disc_left + width, win.get_width()))
+            blits += get_row_blits(end_disc, rows[disc_rows], lows, highs, disc_left, rows[disc_rows] - disc_top)
 
-        surf = pygame.transform.rotozoom(surf, math.degrees(self.ship.rotation), 1)
-        return surf
+        win.blits(blits, doreturn=False)
 
-    def draw(self, win: pygame.Surface, focus_point: Vector) -> None:
+    def draw(self, win: RenderQueue, focus_point: Vector) -> None:
         if not self.shooting:
             return
         self.shooting = False
@@ -107,9 +152,91 @@ class Laser():
         self.range = min(self.range, math.hypot(game.WIDTH/2, game.HEIGHT/2)/game.ZOOM)
 
         ship = self.ship
-        centre = ship.position + Vector(0, -ship.image.get_height()/2 - self.range/2)  # centre of laser
-        centre.rotate_about(ship.rotation, ship.position)
-
-        surf = self.draw_beam()
-
-        win.blit(surf, ((centre - focus_point) * game.ZOOM + game.CENTRE_POINT - Vector(surf.get_width()/2, surf.get_height()/2)).to_tuple())
+        start = ship.position + Vector(0, -ship.image.get_height()/2)  # start of laser
+        start.rotate_about(ship.rotation, ship.position)
+
+        # The beam is drawn in rows that each blit part of an image, which can't be queued
+        self.draw_beam(win.get_surface(), (start - focus_point) * game.ZOOM + game.CENTRE_POINT, self.range * game.ZOOM)
+
+
+
+def get_spans(direction: float, offsets: np.ndarray, start: float | None, end: float | None, lows, highs) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the pixels [low, high) of each row whose centres have a distance along the beam of at least `start` and less than `end`
+    \nThe distance of pixel x is `direction` * (x + 0.5) + the row's offset, None means there is no limit.
+    Neighbouring spans round their shared limit the same way, so there are no gaps or overlaps between them"""
+    lows = np.broadcast_to(lows, offsets.shape)
+    highs = np.broadcast_to(highs, offsets.shape)
+
+    if direction == 0:
+        inside = np.ones(offsets.shape, dtype=bool)
+        if start is not None:
+            inside &= offsets >= start
+        if end is not None:
+            inside &= offsets < end
+        return lows, np.where(inside, highs, lows)
+
+    if direction > 0:
+        if start is not None:
+            lows = np.maximum(lows, np.ceil((start - offsets) / direction - 0.5))
+        if end is not None:
+            highs = np.minimum(highs, np.ceil((end - offsets) / direction - 0.5))
+    else:
+        if start is not None:
+            highs = np.minimum(highs, np.floor((start - offsets) / direction - 0.5) + 1)
+        if end is not None:
+            lows = np.maximum(lows, np.floor((end - offsets) / direction - 0.5) + 1)
+
+    return lows.astype(np.int64), highs.astype(np.int64)
+
+
+def get_row_blits(image: pygame.Surface, rows: np.ndarray, lows: np.ndarray, highs: np.ndarray, image_lefts, image_rows: np.ndarray) -> list:
+    """Returns the blits that draw pixels [low, high) of each row from row `image_row` of `image`, with `image` starting at `image_left`"""
+    image_lefts = np.broadcast_to(image_lefts, rows.shape)
+    drawn = lows < highs
+    spans = zip(rows[drawn].tolist(), lows[drawn].tolist(), highs[drawn].tolist(), image_lefts[drawn].tolist(), image_rows[drawn].tolist())
+    if image.get_width() <= 65535:
+        return [(image, (low, y), (low - image_left, image_row, high - low, 1)) for y, low, high, image_left, image_row in spans]
+
+    # Blitting an area that starts more than 65535 pixels into a surface draws the wrong pixels, but blitting a subsurface works
+    return [(image.subsurface(low - image_left, image_row, high - low, 1), (low, y)) for y, low, high, image_left, image_row in spans]
+
+
+
+def create_beam(width: int) -> pygame.Surface:
+    """Returns the laser beam with the shortest length, it's ends are rounded and it has one row in the middle"""
+    beam_width = width / 11  # The glow is 10 times the width of the beam
+    glow_radius = width - beam_width
+    height = width - width % 2 + 1
+    surf = pygame.Surface((width, height), flags=pygame.SRCALPHA)
+
+    # Draw beam glow
+    for step in range(int(glow_radius/4)+1):
+        step=step*2
+        pygame.draw.rect(surf, (40, 100, 150, (step/width)**1.3*510), (step, step, width-step*2, height-step*2), border_radius=round(width-step), width=3)
+
+    # Draw light beam
+    pygame.draw.rect(surf, (81, 200, 252), (glow_radius/2, glow_radius/2, beam_width, height-glow_radius), border_radius=round(beam_width))
+
+    return surf
+
+
+def create_beam_profile(beam: pygame.Surface, length: int) -> pygame.Surface:
+    """Returns the middle row of the beam stretched to `length` pixels"""
+    middle = beam.subsurface(0, beam.get_height() // 2, beam.get_width(), 1)
+    if length <= 65535:
+        return pygame.transform.scale(middle, (length, 1))
+
+    # pygame can't scale to more than 65535 pixels
+    surf = pygame.Surface((length, 1), flags=pygame.SRCALPHA)
+    pygame.surfarray.pixels2d(surf)[:, 0] = pygame.surfarray.array2d(middle)[np.arange(length) * beam.get_width() // length, 0]
+    return surf
+
+
+def create_beam_end(beam: pygame.Surface) -> pygame.Surface:
+    """Returns the two rounded ends of the beam joined together, a disc that is drawn over both ends of a beam of any length"""
+    width = beam.get_width()
+    radius = width // 2
+    surf = pygame.Surface((width, width), flags=pygame.SRCALPHA)
+    surf.blit(beam, (0, 0), (0, 0, width, radius))
+    surf.blit(beam, (0, radius), (0, radius + 1, width, radius))
+    return surf
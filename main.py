@@ -2,7 +2,6 @@ import game
 from entities import Bullet, Asteroid
 from weapons import PlayerBlaster, PlayerGatlingGun, PlayerSniper
 from laser import Laser
-from particles import ParticleSystem
 import ui
 import menu
 import graphics
@@ -54,8 +53,11 @@ def draw_window(delta_time):
     graphics.draw_stars()
 
 
+    # Everything in the world is drawn into the queue, then drawn together
+    render_queue = graphics.RenderQueue(game.WIN)
     for object in graphics.get_entities_to_draw():
-        object.draw(game.WIN, player.position)
+        object.draw(render_queue, player.position)
+    render_queue.flush()
 
     if game.DEBUG_SCREEN:
         graphics.draw_chunks()
@@ -141,26 +143,26 @@ def update_objects(delta_time):
     """Updates all objects, e.g. adjusts positions based on velocity"""
 
     # Loop until every object has been updated e.g. moved
-    # Entity set has to be copied as entity might be deleted from the actual set
-    for object in filter(lambda object: type(object) != Bullet and type(object) != Asteroid and type(object) != ParticleSystem, CHUNKS.entities.copy()):
+    # get_entities returns a new list as entity might be deleted from the loaded entities
+    for object in CHUNKS.get_entities(exclude=(Bullet, Asteroid)):
 
         # Update object e.g. move it
         object.update(delta_time)
 
     # Asteroids are updated after ships to ensure that ships are never inside of an asteroid
-    for object in filter(lambda object: type(object) == Asteroid, CHUNKS.entities.copy()):
+    for object in CHUNKS.get_entities(Asteroid):
         object.update(delta_time)
 
     # Bullets are updated after everything else to ensure that the ships they may hit have been updated (and moved to the right position)
-    for object in filter(lambda object: type(object) == Bullet, CHUNKS.entities.copy()):
+    for object in CHUNKS.get_entities(Bullet):
         object.update(delta_time)
+    CHUNKS.projectiles.update(delta_time)
 
     # Unload all chunks and load chunks around player
     CHUNKS.update(player)
 
     # Update particles
-    for particle_system in filter(lambda object: type(object) == ParticleSystem, CHUNKS.entities.copy()):
-        particle_system.update(delta_time)
+    CHUNKS.particles.update(delta_time)
 
 
 def main():
@@ -1686,6 +1686,7 @@ settings = Page(
     SettingButton(0.25, 2/6, lambda: f"FULL SCREEN: {game.FULLSCREEN}"     , font_size=40, value="FULLSCREEN"   , function_action=lambda: change_fullscreen()),
     SettingButton(0.75, 2/6, lambda: f"LOAD DISTANCE: {game.LOAD_DISTANCE}", font_size=40, value="LOAD_DISTANCE", function_action=lambda: game.save_settings(), min=4, max=26),
     SettingButton(0.25, 3/6, lambda: f"RENDER: {"AGGRESSIVE" if game.ENTITY_CULLING else "PASSIVE"}", font_size=40, value="ENTITY_CULLING", function_action=lambda: game.save_settings()),
+    SettingButton(0.75, 3/6, lambda: f"PARTICLES: {game.PARTICLE_CAP}K"   , font_size=40, value="PARTICLE_CAP" , function_action=lambda: game.save_settings(), min=1, max=30),
     Button(0.5, 7/8, "Main Menu", font_size=40, function=lambda: Menu.change_page(main_menu)),
     click=lambda: page_click(),
     escape=lambda: Menu.change_page(main_menu),
@@ -1926,7 +1927,7 @@ laser = Page(
     Button(0.2, 0.42, "Gatling", function=lambda: Menu.change_page(gatling_gun), uniform=True),
     Button(0.2, 0.54, "Sniper" , function=lambda: Menu.change_page(sniper_gun), uniform=True),
     Button(0.2, 0.66, "Laser"  , function=lambda: Menu.change_page(laser), outline_colour=(255, 125, 0), uniform=True),
-    UpgradeBar(0.4, "Range" , "PLAYER_LASER_RANGE", x=0.32, min_value=game.PLAYER_LASER_RANGE, max_value=600),
+    UpgradeBar(0.4, "Range" , "PLAYER_LASER_RANGE", x=0.32, min_value=game.PLAYER_LASER_RANGE, max_value=2000),
     UpgradeBar(0.5, "Damage", "PLAYER_LASER_DAMAGE", x=0.32, min_value=game.PLAYER_LASER_DAMAGE, max_value=20),
     Text(0.875, 0.12, lambda: f"{game.SCRAP_COUNT}", align=pygame.FONT_RIGHT),
     Image(0.9, 0.12, images.SCRAP, scale=6),
@@ -1,11 +1,16 @@
 from __future__ import annotations
-from typing import Iterator
+from typing import Iterator, TYPE_CHECKING
 import images
+import sprites
 import game
 import random
 import math
 import pygame
 
+# This allows type hinting for RenderQueue, done this way to avoid circular import errors
+if TYPE_CHECKING:
+    from graphics import RenderQueue
+
 
 
 class Vector():
@@ -162,22 +167,27 @@ def random_vector(magnitude: float) -> Vector:
 
 
 class Object():
+    faction = 0
+    hittable_by = 0  # Bitmask of the factions that can damage this, e.g. hit if bullet.faction & entity.hittable_by
+    z = 0  # Objects with a higher z are drawn on top
+
     def __init__(self, position: Vector, image=lambda: images.DEFAULT) -> None:
 
         self.position = position
         self.image = image()
 
         self.load_image = image  # a function that returns a pygame Surface
-        self.scale = 1
-        self.scaled_image = self.image
 
         # Set the size (dimensions), original size of image, doesn't change when rotating
         self.size = Vector(self.image.get_width(), self.image.get_height())
 
+        # Radius of a circle that contains the image at any rotation, used for quick collision and proximity checks
+        self.radius = sprites.get_radius(self.image)
+
     def __setstate__(self, state: dict) -> None:
         self.__dict__.update(state)
         self.image = self.load_image()
-        self.scaled_image = pygame.transform.scale_by(self.image, self.scale)
+        self.radius = sprites.get_radius(self.image)
 
     def update(self, delta_time: float) -> None:
         pass
@@ -185,18 +195,26 @@ class Object():
     def distance_to(self, object: Object) -> float:
         return (self.position - object.position).magnitude()
 
+    def get_sprite(self) -> pygame.Surface:
+        """Returns the unscaled image that is drawn"""
+        return self.image
+
     def get_zoomed_image(self) -> pygame.Surface:
-        if self.scale != game.ZOOM:
-            # if self.scaled_image isn't the right scale -> recalculate the scaled_image
-            self.scale = game.ZOOM
-            self.scaled_image = pygame.transform.scale_by(self.image, self.scale)
+        # Scaled images are shared between objects with the same sprite, and only change when the zoom changes bucket
+        return sprites.get_scaled_image(self.get_sprite(), game.ZOOM)
+
+    def draw(self, win: RenderQueue, focus_point: Vector) -> None:
+        zoom = game.ZOOM
+        x = (self.position.x - focus_point.x) * zoom + game.CENTRE_POINT.x
+        y = (self.position.y - focus_point.y) * zoom + game.CENTRE_POINT.y
 
-        return self.scaled_image
+        # Large sprites (e.g. stations when zoomed in) are drawn in tiles, so only the part on the screen is scaled
+        if sprites.is_large(self.get_sprite(), zoom):
+            sprites.draw_large(win, self.get_sprite(), (x, y), zoom)
+            return
 
-    def draw(self, win: pygame.Surface, focus_point: Vector) -> None:
         image = self.get_zoomed_image()
-        offset = game.CENTRE_POINT - Vector(image.get_width(), image.get_height()) * 0.5
-        win.blit(image, (round((self.position - focus_point) * game.ZOOM + offset)).to_tuple())
+        win.blit(image, (round(x - image.get_width()/2), round(y - image.get_height()/2)))
 
 
 
@@ -221,12 +239,6 @@ class Entity(MoveableObject):
         # self.rotation is stored as radians, -pi < rotation < pi
         # 0 is upwards, +ve is anti-clockwise
         self.rotation = rotation
-        self.image_rotation = 0
-        self.rotated_image = self.image
-
-    def __setstate__(self, state: dict) -> None:
-        super().__setstate__(state)
-        self.rotated_image = pygame.transform.rotate(self.scaled_image, math.degrees(self.rotation))
 
     def rotate_to(self, delta_time: float, rotation: float, speed: float) -> None:
         # Simplify rotation (-pi < self.rotation < pi)
@@ -272,24 +284,10 @@ class Entity(MoveableObject):
             self.velocity = new_velocity
 
     def get_image(self) -> pygame.Surface:
-        if self.scale != game.ZOOM:
-            # if self.scaled_image isn't the right scale -> recalculate the scaled_image
-            self.scale = game.ZOOM
-            self.scaled_image = pygame.transform.scale_by(self.image, self.scale)
-
-            # if image has been rescaled, then it will also need to be rotated again
-            self.image_rotation = self.rotation
-            self.rotated_image = pygame.transform.rotate(self.scaled_image, math.degrees(self.rotation))
-
-            return self.rotated_image
-
-        if self.image_rotation != self.rotation:
-            self.image_rotation = self.rotation
-            self.rotated_image = pygame.transform.rotate(self.scaled_image, math.degrees(self.rotation))
-
-        return self.rotated_image
+        # Rotated images are shared between entities with the same sprite, rather than each entity rotating it's own
+        return sprites.get_rotated_image(self.image, game.ZOOM, self.rotation)
 
-    def draw(self, win: pygame.Surface, focus_point: Vector) -> None:
+    def draw(self, win: RenderQueue, focus_point: Vector) -> None:
         image = self.get_image()
-        offset = game.CENTRE_POINT - Vector(image.get_width(), image.get_height()) * 0.5
-        win.blit(image, (round((self.position - focus_point) * game.ZOOM + offset)).to_tuple())
+        win.blit(image, (round((self.position.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x - image.get_width()/2),
+                         round((self.position.y - focus_point.y) * game.ZOOM + game.CENTRE_POINT.y - image.get_height()/2)))
@@ -1,17 +1,75 @@
-from objects import Entity, Vector, random_vector
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from objects import Entity, Vector
+from sprites import Cache, get_surface_bytes
 import game
-import random
+import math
+import numpy as np
 import pygame
 
+# This allows type hinting for RenderQueue, done this way to avoid circular import errors
+if TYPE_CHECKING:
+    from graphics import RenderQueue
+
 
 
 draw_circle = pygame.draw.circle
+random_generator = np.random.default_rng()
+
+BURST_BUDGET = 400  # Most particles that can be spawned by bursts each frame, so many hits at once don't cause a spike
+CAP_THROTTLE = 0.5  # Spawning slows down once this fraction of game.PARTICLE_CAP is alive, reaching none at the cap
+MIN_DRAW_RADIUS = 0.5  # Particles smaller than a pixel on screen (including bloom) aren't drawn
+BLOOM_SIZE_STEPS = 8  # Number of bloom sprite sizes each time the size doubles
+COLOUR_STEP = 32  # Random and bloom colours are rounded to a multiple of this, so they share sprites
+BLOOM_CACHE_BYTES = 32 * 1024 * 1024  # Memory limit of the bloom particle sprite cache
+CIRCLE_CACHE_BYTES = 8 * 1024 * 1024  # Memory limit of the plain particle circle cache
+bloom_images = Cache("Bloom", BLOOM_CACHE_BYTES, get_surface_bytes)
+circle_images = Cache("Circles", CIRCLE_CACHE_BYTES, get_surface_bytes)
+
+def get_bloom_image(colour: tuple[int, int, int], size: float, bloom: float) -> pygame.Surface:
+    """Returns a particle of radius `size` (in pixels) and it's bloom, with the size and colour rounded so that the sprite can be shared
+    \nThe particle is in the centre of the sprite"""
+    size_bucket = round(math.log2(max(size, 0.5)) * BLOOM_SIZE_STEPS)
+    colour = tuple(min(255, round(value / COLOUR_STEP) * COLOUR_STEP) for value in colour)
+
+    def create() -> pygame.Surface:
+        SIZE = 2 ** (size_bucket / BLOOM_SIZE_STEPS)
+        radius = max(1, SIZE*bloom)
+        surface = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
+
+        max_radius = int(SIZE*bloom)
+        min_radius = int(SIZE)
+
+        # draw circle going from in to out
+        spread = (max_radius - min_radius) / 255  # 255 is max opaque
+        for radius1 in range(min_radius, max_radius):  # e.g. range(10, 15)
+            draw_circle(surface, (*colour, (max_radius-radius1) / spread), (radius, radius), radius1, width=2)
+
+        draw_circle(surface, colour, (radius, radius), max(1, SIZE))
+        return surface
+
+    return bloom_images.get((colour, size_bucket, bloom), create)
+
+def get_circle_image(colour: tuple[int, int, int], radius: int) -> pygame.Surface:
+    """Returns a circle of `radius` (in pixels) in the centre of a sprite 2*`radius` wide"""
+    def create() -> pygame.Surface:
+        # A colour key is faster to blit than per pixel alpha, as the circle has no transparent edges
+        background = (0, 0, 0) if colour != (0, 0, 0) else (255, 255, 255)
+        surface = pygame.Surface((radius*2, radius*2)).convert()
+        surface.fill(background)
+        draw_circle(surface, colour, (radius, radius), radius)
+        surface.set_colorkey(background, pygame.RLEACCEL)
+        return surface
+
+    return circle_images.get((colour, radius), create)
+
+
 
 class ParticleSystem():
     """
     Creates a controller to spawn particles
 
-    NOTE: Automatically adds this system to game.CHUNKS
+    NOTE: Automatically adds this system to game.CHUNKS.particles
 
     Parameters:
 
@@ -51,7 +109,9 @@ class ParticleSystem():
     """
 
     __slots__ = ("entity_offset", "previous_position", "z", "draw", "bloom", "duration", "lifetime", "time_alive", "period", "delay",
-                 "get_start_size", "end_size", "get_colour", "entity", "position", "active", "get_velocity", "particles")
+                 "start_size", "max_start_size", "end_size", "colour", "max_colour", "entity", "position", "active", "paused",
+                 "speed", "speed_variance", "initial_velocity",
+                 "start", "end", "origins", "velocities", "spawn_times", "size_differences", "start_sizes", "colours")
 
     def __init__(self, position: Vector | Entity, entity_offset=lambda x: Vector(0, 0), z: int = 1,
                  start_size: float = 5, max_start_size: float | None = None, end_size: float = 0,
@@ -72,20 +132,14 @@ class ParticleSystem():
         self.period = 1 / frequency
         self.delay = 0
 
-        if max_start_size:
-            self.get_start_size = lambda: start_size + random.random() * (max_start_size - start_size)
-        else:
-            self.get_start_size = lambda: start_size
+        self.start_size = start_size
+        self.max_start_size = max_start_size
         self.end_size = end_size
-
-        if max_colour:
-            self.get_colour = lambda: (random.randint(colour[0], max_colour[0]),
-                                       random.randint(colour[1], max_colour[1]),
-                                       random.randint(colour[2], max_colour[2]))
-        else:
-            self.get_colour = lambda: colour
+        self.colour = colour
+        self.max_colour = max_colour
 
         self.active = False
+        self.paused = False  # True while the entity isn't loaded, set by Particles.update
         if not isinstance(position, Vector):  # if position is an Entity
             self.entity = position
             self.position = self.entity.position
@@ -93,21 +147,23 @@ class ParticleSystem():
             self.position = position
             self.entity = None
 
-        if speed_variance:
-            if self.entity:
-                self.get_velocity = lambda: random_vector(speed + (random.random()*2-1) * speed_variance) + initial_velocity(self.entity)
-            else:
-                self.get_velocity = lambda: random_vector(speed + (random.random()*2-1) * speed_variance) + initial_velocity
-        else:
-            if self.entity:
-                self.get_velocity = lambda: random_vector(speed) + initial_velocity(self.entity)
-            else:
-                self.get_velocity = lambda: random_vector(speed) + initial_velocity
+        self.speed = speed
+        self.speed_variance = speed_variance
+        self.initial_velocity = initial_velocity
 
-        # [position, velocity, colour, time_alive, size_difference, start_size]
-        self.particles: list[list[list, list, tuple[int, int, int], float, float, float]] = []
+        # The particles are stored as arrays, the alive particles are at indices start to end, from oldest to newest
+        # Particles move in a straight line, so their position is origin + velocity * age, where age = time_alive - spawn_time
+        capacity = max(16, int(lifetime / self.period) + 1)
+        self.start = 0
+        self.end = 0
+        self.origins = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        self.spawn_times = np.zeros(capacity)
+        self.size_differences = np.zeros(capacity)
+        self.start_sizes = np.zeros(capacity)
+        self.colours = np.zeros((capacity, 3), dtype=np.uint8)
 
-        game.CHUNKS.add_entity(self)
+        game.CHUNKS.particles.add(self)
 
         if not duration:
             self.duration = 0
@@ -115,6 +171,9 @@ class ParticleSystem():
                 self.burst()
 
 
+    def __len__(self) -> int:
+        return self.end - self.start
+
     def update(self, delta_time: float) -> None:
         self.delay += delta_time
         self.time_alive += delta_time
@@ -123,105 +182,263 @@ class ParticleSystem():
 
         if self.entity and self.entity in game.CHUNKS.entities:
             self.previous_position = self.position
-            game.CHUNKS.set_position(self, self.entity.position + self.entity_offset(self.entity))
+            self.position = self.entity.position + self.entity_offset(self.entity)
 
         if not self.entity and self.time_alive > self.duration:  # check if the System's life time is over
 
-            if not self.particles:  # if there are no more particles, then the System can be destroyed
-                game.CHUNKS.remove_entity(self)
+            if not len(self):  # if there are no more particles, then the System can be destroyed
+                game.CHUNKS.particles.remove(self)
             return
 
         if self.entity and not self.active:  # if not active: don't spawn particles
             self.delay = 0
             return
 
-        if self.delay > self.period:  # if the System should stil be alive AND the spawning delay is over, then spawn in more particles
+        # Fewer particles are spawned when they would be small, far away or over budget
+        spawn_rate = game.CHUNKS.particles.get_spawn_rate(self.position)
+        if not spawn_rate:
+            self.delay = 0
+            return
+        period = self.period / spawn_rate
+
+        if self.delay > period:  # if the System should stil be alive AND the spawning delay is over, then spawn in more particles
 
-            count = int(self.delay / self.period)
+            count = int(self.delay / period)
 
-            self.delay -= self.period * count
+            self.delay -= period * count
 
+            # The particles are spread out along the distance moved this frame, as if they were spawned between frames
+            fraction = (np.arange(1, count+1) / count)[:, None]
+            velocities = self.get_velocities(count)
             if self.entity:
                 vec = self.position - self.previous_position
-                for i in range(1, count+1):
-                    velocity = self.get_velocity()
-                    position = self.previous_position + (i/count) * vec + (1-i/count) * velocity * delta_time
-                    start_size = self.get_start_size()
-                    start_size = start_size + (self.end_size - start_size) * (1-i/count) * self.period
-                    self.spawn(position, velocity, start_size)
-
+                positions = (self.previous_position.x, self.previous_position.y) + fraction * (vec.x, vec.y) + (1-fraction) * velocities * delta_time
             else:
-                for i in range(1, count+1):
-                    velocity = self.get_velocity()
-                    position = self.position + (1-i/count) * velocity * delta_time
-                    start_size = self.get_start_size()
-                    start_size = start_size + (self.end_size - start_size) * (1-i/count) * self.period
-                    self.spawn(position, velocity, start_size)
+                positions = (self.position.x, self.position.y) + (1-fraction) * velocities * delta_time
+
+            start_sizes = self.get_start_sizes(count)
+            start_sizes = start_sizes + (self.end_size - start_sizes) * (1-fraction[:, 0]) * self.period
+            self.spawn(positions, velocities, start_sizes)
+
+    def age(self, delta_time: float) -> None:
+        """Ages the particles without moving the system or spawning any, used while the system is paused"""
+        self.time_alive += delta_time
+        self.update_particles(delta_time)
 
+    # optimized
     def update_particles(self, delta_time: float) -> None:
-        # [position, velocity, colour, time_alive, size_difference, start_size]
-        for particle in self.particles:
-            # Move particle
-            particle[0][0] += particle[1][0] * delta_time
-            particle[0][1] += particle[1][1] * delta_time
-            particle[3] += delta_time  # Add time to time_alive
-
-        # self.particles is sorted from oldest to newest, so when we reach a particle
-        # that hasn't expired we can stop looking through the list
-        for particle in self.particles:
-            if particle[3] > self.lifetime:  # If particle's time_alive expires, then destroy particle
-                self.particles.remove(particle)
+        # Particles are aged by time_alive increasing, and they are sorted from oldest to newest,
+        # so the particles that have expired (age > lifetime) are the ones at the start
+        self.start += int(np.searchsorted(self.spawn_times[self.start:self.end], self.time_alive - self.lifetime))
+
+    def get_particles(self, focus_point: Vector) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the screen positions, radii (without bloom) and colours of the particles that are on the screen"""
+        start, end = self.start, self.end
+        ages = self.time_alive - self.spawn_times[start:end]
+
+        positions = ((self.origins[start:end] + self.velocities[start:end] * ages[:, None] - (focus_point.x, focus_point.y)) * game.ZOOM
+                     + (game.CENTRE_POINT.x, game.CENTRE_POINT.y))
+        radii = (self.start_sizes[start:end] + self.size_differences[start:end] * ages / self.lifetime) * game.ZOOM  # radius is start_size + (size_difference * time_alive/life_time)
+
+        margin = np.maximum(radii, 1) * self.bloom
+        visible = ((positions[:, 0] > -margin) & (positions[:, 0] < game.WIDTH + margin) &
+                   (positions[:, 1] > -margin) & (positions[:, 1] < game.HEIGHT + margin) &
+                   (radii * self.bloom >= MIN_DRAW_RADIUS))
+
+        return positions[visible], radii[visible], self.colours[start:end][visible]
+
+    # optimized
+    def draw_particles(self, WIN: RenderQueue, focus_point: Vector) -> None:
+        positions, radii, colours = self.get_particles(focus_point)
+        if not len(colours):
+            return
+        radii = np.maximum(np.rint(radii), 1).astype(np.int64)
+        positions -= radii[:, None]
+
+        # The particles are cached circles, so they are all drawn together
+        # Each different colour and radius is only looked up once, by packing them into one number
+        colours = colours.astype(np.int64)
+        keys = (colours[:, 0] << 48) | (colours[:, 1] << 40) | (colours[:, 2] << 32) | radii
+        keys, indices = np.unique(keys, return_inverse=True)
+        images = [get_circle_image((key >> 48 & 255, key >> 40 & 255, key >> 32 & 255), key & 0xFFFFFFFF) for key in keys.tolist()]
+
+        WIN.fblits(zip(map(images.__getitem__, indices.tolist()), positions.tolist()))
+
+    def draw_bloom_particles(self, WIN: RenderQueue, focus_point: Vector) -> None:
+        positions, radii, colours = self.get_particles(focus_point)
+
+        # The particles and their bloom are cached sprites, so they are all drawn together
+        blits = []
+        for (x, y), size, colour in zip(positions.tolist(), radii.tolist(), colours.tolist()):
+            surface = get_bloom_image(colour, size, self.bloom)
+            radius = surface.get_width() / 2
+            blits.append((surface, (x - radius, y - radius)))
+
+        WIN.fblits(blits)
+
+
+    def get_velocities(self, count: int) -> np.ndarray:
+        speeds = np.full(count, float(self.speed))
+        if self.speed_variance:
+            speeds += (random_generator.random(count)*2-1) * self.speed_variance
+
+        angles = random_generator.random(count) * 2 * math.pi
+        initial_velocity = self.initial_velocity(self.entity) if self.entity else self.initial_velocity
+        return speeds[:, None] * np.stack((np.cos(angles), np.sin(angles)), axis=1) + (initial_velocity.x, initial_velocity.y)
+
+    def get_start_sizes(self, count: int) -> np.ndarray:
+        if self.max_start_size:
+            return self.start_size + random_generator.random(count) * (self.max_start_size - self.start_size)
+        return np.full(count, float(self.start_size))
+
+    def get_colours(self, count: int) -> np.ndarray:
+        if self.max_colour:
+            # Rounded so that they share sprites, but kept between colour and max_colour
+            colours = random_generator.integers(self.colour, np.add(self.max_colour, 1), size=(count, 3))
+            return np.clip(np.rint(colours / COLOUR_STEP) * COLOUR_STEP, self.colour, self.max_colour)
+        return np.tile(self.colour, (count, 1))
+
+    def burst(self, position: Vector | None = None, count: int | None = None) -> None:
+        """Spawns `count` particles at `position` all at once, by default the system's position and 1 second of particles
+        \nThe particles are taken from this frame's burst budget and scaled by the spawn rate, so fewer may be spawned"""
+        if position is None:
+            position = self.position
+        count = int(1/self.period) if count is None else count
+        count = game.CHUNKS.particles.take_burst_budget(round(count * game.CHUNKS.particles.get_spawn_rate(position)))
+        if count:
+            self.spawn(np.tile((position.x, position.y), (count, 1)), self.get_velocities(count), self.get_start_sizes(count))
+
+    def spawn(self, positions: np.ndarray, velocities: np.ndarray, start_sizes: np.ndarray) -> None:
+        count = len(positions)
+
+        if self.end + count > len(self.spawn_times):
+            self.make_space(count)
+
+        start, end = self.end, self.end + count
+        self.origins[start:end] = positions
+        self.velocities[start:end] = velocities
+        self.spawn_times[start:end] = self.time_alive
+        self.size_differences[start:end] = self.end_size - start_sizes
+        self.start_sizes[start:end] = start_sizes
+        self.colours[start:end] = self.get_colours(count)
+        self.end = end
+        game.CHUNKS.particles.particle_count += count
+
+    def make_space(self, count: int) -> None:
+        """Moves the alive particles to the start of the arrays, and doubles their size if there still isn't space for `count` more"""
+        alive = self.end - self.start
+        capacity = len(self.spawn_times)
+        while alive + count > capacity:
+            capacity *= 2
+
+        for name in ("origins", "velocities", "spawn_times", "size_differences", "start_sizes", "colours"):
+            array = getattr(self, name)
+            if capacity != len(array):
+                new_array = np.zeros((capacity, *array.shape[1:]), dtype=array.dtype)
             else:
-                break
+                new_array = array
+            new_array[:alive] = array[self.start:self.end]
+            setattr(self, name, new_array)
 
+        self.start = 0
+        self.end = alive
 
-    def draw_particles(self, WIN: pygame.Surface, focus_point: Vector) -> None:
-        ZOOM = game.ZOOM
-        CENTRE_POINT_X = game.CENTRE_POINT.x
-        CENTRE_POINT_Y = game.CENTRE_POINT.y
-        FOCUS_POINT_X = focus_point.x
-        FOCUS_POINT_Y = focus_point.y
 
-        # [position, velocity, colour, time_alive, size_difference, start_size]
-        for particle in self.particles:
-            draw_circle(WIN, particle[2],
-                           ((particle[0][0] - FOCUS_POINT_X) * ZOOM + CENTRE_POINT_X,
-                            (particle[0][1] - FOCUS_POINT_Y) * ZOOM + CENTRE_POINT_Y),
-                             max(1, (particle[5] + particle[4] * particle[3] / self.lifetime) * ZOOM))  # radius is start_size + (size_difference * time_alive/life_time)
 
-    def draw_bloom_particles(self, WIN: pygame.Surface, focus_point: Vector) -> None:
-        ZOOM = game.ZOOM
-        CENTRE_POINT_X = game.CENTRE_POINT.x
-        CENTRE_POINT_Y = game.CENTRE_POINT.y
-        FOCUS_POINT_X = focus_point.x
-        FOCUS_POINT_Y = focus_point.y
+class Particles():
+    """
+    Every ParticleSystem in the world, they are updated together and drawn in layers by their z value
 
-        # [position, velocity, colour, time_alive, size_difference, start_size]
-        for position, velocity, colour, time_alive, size_difference, start_size in self.particles:
-            SIZE = (start_size + size_difference * time_alive / self.lifetime) * ZOOM
-            radius = max(1, SIZE*self.bloom)
-            surface = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
+    The layers are drawn instead of the ParticleSystems, so the systems aren't chunk entities
 
-            max_radius = int(SIZE*self.bloom)
-            min_radius = int(SIZE)
+    The number of alive particles is kept under game.PARTICLE_CAP (in thousands) by slowing down spawning as it gets closer
+    """
+    __slots__ = ("layers", "burst_budget", "recent", "particle_count", "budget_rate")
+    def __init__(self) -> None:
+        self.layers: dict[int, ParticleLayer] = {}
+        self.burst_budget = BURST_BUDGET  # Particles that bursts can still spawn this frame
+        self.particle_count = 0  # Alive particles, counted each update and increased as they are spawned
+        self.budget_rate = 1  # Fraction of particles spawned this frame, from how much of the cap is used
+        self.recent: dict[str, list[ParticleSystem]] = {}  # Recently made systems of each kind, so they can be reused
+
+    def __len__(self) -> int:
+        return sum(len(layer.systems) for layer in self.layers.values())
+
+    def add(self, particle_system: ParticleSystem) -> None:
+        if particle_system.z not in self.layers:
+            self.layers[particle_system.z] = ParticleLayer(particle_system.z)
+        self.layers[particle_system.z].systems[particle_system] = None
+
+    def remove(self, particle_system: ParticleSystem) -> None:
+        self.layers[particle_system.z].systems.pop(particle_system, None)
+
+    def take_burst_budget(self, count: int) -> int:
+        """Returns how many of `count` particles can be spawned by a burst this frame, and removes them from the budget"""
+        count = max(0, min(count, self.burst_budget, game.PARTICLE_CAP*1000 - self.particle_count))
+        self.burst_budget -= count
+        return count
+
+    def add_recent(self, kind: str, particle_system: ParticleSystem) -> None:
+        self.recent.setdefault(kind, []).append(particle_system)
+
+    def get_recent(self, kind: str, position: Vector, radius: float, time: float) -> ParticleSystem | None:
+        """Returns a system of `kind` within `radius` of `position` that was made less than `time` seconds ago, if there is one"""
+        recent = [particle_system for particle_system in self.recent.get(kind, [])
+                  if particle_system.time_alive < time and particle_system in self.layers[particle_system.z].systems]
+        self.recent[kind] = recent
+
+        for particle_system in recent:
+            if (particle_system.position - position).magnitude() < radius:
+                return particle_system
+        return None
+
+    def get_spawn_rate(self, position: Vector) -> float:
+        """Returns the fraction (0 to 1) of particles that should be spawned at `position`
+        \nThis is lower when zoomed out, off the screen or close to the particle cap"""
+        rate = self.budget_rate * min(1, game.ZOOM)
+
+        # Particles further than the edge of the screen are less likely to be seen, none are spawned twice as far away
+        screen_radius = game.CENTRE_POINT.magnitude() / game.ZOOM
+        distance = (position - game.player.position).magnitude()
+        if distance > screen_radius:
+            rate *= max(0, 2 - distance/screen_radius)
+        return rate
 
-            # draw circle going from in to out
-            spread = (max_radius - min_radius) / 255  # 255 is max opaque
-            for radius1 in range(min_radius, max_radius):  # e.g. range(10, 15)
-                draw_circle(surface, (*colour, (max_radius-radius1) / spread), (radius, radius), radius1, width=2)
+    def update(self, delta_time: float) -> None:
+        self.burst_budget = BURST_BUDGET
+        entities = game.CHUNKS.entities
 
-            WIN.blit(surface, ((position[0] - FOCUS_POINT_X) * ZOOM + CENTRE_POINT_X - radius, (position[1] - FOCUS_POINT_Y) * ZOOM + CENTRE_POINT_Y - radius))
+        # A list is used as systems remove themselves when they finish
+        systems = [particle_system for layer in self.layers.values() for particle_system in layer.systems]
 
-            draw_circle(WIN, colour, ((position[0] - FOCUS_POINT_X) * ZOOM + CENTRE_POINT_X, (position[1] - FOCUS_POINT_Y) * ZOOM + CENTRE_POINT_Y), max(1, SIZE))
+        # Systems following an entity that isn't loaded are paused until it is loaded again
+        # Their particles still age, but aren't drawn or counted towards the cap
+        for particle_system in systems:
+            particle_system.paused = particle_system.entity is not None and particle_system.entity not in entities
 
+        cap = game.PARTICLE_CAP * 1000
+        self.particle_count = sum(len(particle_system) for particle_system in systems if not particle_system.paused)
+        self.budget_rate = min(1, max(0, (cap - self.particle_count) / (cap * (1-CAP_THROTTLE))))
 
-    def burst(self) -> None:
-        for _ in range(int(1/self.period)):
-            self.spawn(self.position, self.get_velocity(), self.get_start_size())
+        for particle_system in systems:
+            if particle_system.paused:
+                particle_system.age(delta_time)
+            else:
+                particle_system.update(delta_time)
 
-    def spawn(self, position: Vector, velocity: Vector, start_size: float) -> None:
+    def get_layers(self) -> list[ParticleLayer]:
+        return list(self.layers.values())
+
+
+
+class ParticleLayer():
+    """The ParticleSystems with the same z value, drawn as one entity"""
+    __slots__ = ("z", "systems")
+    def __init__(self, z: int) -> None:
+        self.z = z
+        self.systems: dict[ParticleSystem, None] = {}  # Used as an ordered set
 
-        # [position, velocity, colour, time_alive, size_difference, start_size]
-        self.particles.append(
-            [[position.x, position.y], [velocity.x, velocity.y], self.get_colour(), 0, self.end_size - start_size, start_size]
-        )
+    def draw(self, win: RenderQueue, focus_point: Vector) -> None:
+        for particle_system in self.systems:
+            if not particle_system.paused:
+                particle_system.draw(win, focus_point)
@@ -1,3 +1,5 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from objects import Vector, random_vector
 from entities import Ship, Scrap
 from weapons import PlayerBlaster
@@ -8,8 +10,15 @@ import random
 import math
 import pygame
 
+# This allows type hinting for RenderQueue, done this way to avoid circular import errors
+if TYPE_CHECKING:
+    from graphics import RenderQueue
+
 
 class Player_Ship(Ship):
+    faction = game.PLAYER
+    hittable_by = game.NEUTRAL | game.ENEMY | game.STATION | game.EXPLOSION
+
     def __init__(
 
         self,
@@ -141,9 +150,10 @@ class Player_Ship(Ship):
         game.SCREEN_SHAKE += damage
 
     def destroy(self):
-        self.boost_particles1.active = False
-        self.boost_particles2.active = False
-        self.smoke_particles.active = False
+        # The particle systems stop following the ship, so they are removed once their particles have gone
+        for particle_system in (self.boost_particles1, self.boost_particles2, self.smoke_particles):
+            particle_system.active = False
+            particle_system.entity = None
 
         # Drop scrap
         for _ in range(game.SCRAP_COUNT):
@@ -159,7 +169,7 @@ class Player_Ship(Ship):
         game.WEAPON_SELECTED = 0
         game.player = get_player()
 
-    def draw(self, win: pygame.Surface, focus_point):
+    def draw(self, win: RenderQueue, focus_point):
         super().draw(win, focus_point)
 
         if hasattr(self.weapon, "draw"):
@@ -171,7 +181,7 @@ class Player_Ship(Ship):
             self.smoke_particles.active = False
 
         if self.tracked_enemy:
-            pygame.draw.circle(game.WIN, (255, 0, 0), ((self.aim_pos.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x, (self.aim_pos.y - focus_point.y) * game.ZOOM + game.CENTRE_POINT.y), 20*game.ZOOM, width=round(2*game.ZOOM))
+            pygame.draw.circle(win.get_surface(), (255, 0, 0), ((self.aim_pos.x - focus_point.x) * game.ZOOM + game.CENTRE_POINT.x, (self.aim_pos.y - focus_point.y) * game.ZOOM + game.CENTRE_POINT.y), 20*game.ZOOM, width=round(2*game.ZOOM))
 
 
 
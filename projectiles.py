@@ -0,0 +1,314 @@
+"""
+This file has the Projectiles engine, used for the bullets fired by Blaster, GatlingGun and Sniper (and their subclasses)
+
+Bullets are stored in preallocated NumPy arrays instead of as entities
+They are moved, expired and collided in one vectorized step, and recycled through a free list
+The arrays double in size when every slot is in use
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from objects import Vector
+from entities import Ship, Asteroid, Missile
+from station import StationCannon
+import effects
+import sprites
+import game
+import math
+import numpy as np
+import pygame
+
+# This allows type hinting for RenderQueue, done this way to avoid circular import errors
+if TYPE_CHECKING:
+    from graphics import RenderQueue
+
+
+
+ROTATION_STEPS = 72  # Number of rotated images per bullet sprite
+
+
+
+class Projectiles():
+    __slots__ = ("position", "velocity", "rotation", "age", "lifetime", "damage", "faction", "sprite", "alive", "owners", "free",
+                 "sprites", "sprite_ids", "asteroid_masks", "images", "images_zoom", "z")
+    def __init__(self, capacity: int = game.PROJECTILE_CAPACITY) -> None:
+        self.position = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.rotation = np.zeros(capacity)
+        self.age = np.zeros(capacity)
+        self.lifetime = np.zeros(capacity)
+        self.damage = np.zeros(capacity)
+        self.faction = np.zeros(capacity, dtype=np.int8)
+        self.sprite = np.zeros(capacity, dtype=np.int16)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+        self.owners: list = [None] * capacity  # The entity that fired each bullet
+        self.free: list[int] = list(range(capacity - 1, -1, -1))  # Unused slots, popped from the end
+
+        self.sprites: list[pygame.Surface] = []
+        self.sprite_ids: dict[pygame.Surface, int] = {}
+
+        self.asteroid_masks: dict[Asteroid, np.ndarray] = {}  # Opaque pixels of each loaded asteroid, indexed [x, y]
+
+        # Rotated images of each sprite at the current zoom bucket, [sprite][rotation step]
+        self.images: list[list[pygame.Surface | None]] = []
+        self.images_zoom: int | None = None
+
+        self.z = 1  # Ensure bullets are seen above ships
+
+    def __len__(self) -> int:
+        return len(self.owners) - len(self.free)
+
+    def grow(self) -> None:
+        """Doubles the size of the arrays"""
+        capacity = len(self.owners)
+
+        for name in ("position", "velocity", "rotation", "age", "lifetime", "damage", "faction", "sprite", "alive"):
+            array = getattr(self, name)
+            new_array = np.zeros((capacity * 2,) + array.shape[1:], dtype=array.dtype)
+            new_array[:capacity] = array
+            setattr(self, name, new_array)
+
+        self.owners.extend([None] * capacity)
+        self.free.extend(range(capacity * 2 - 1, capacity - 1, -1))
+
+    def get_sprite_id(self, image: pygame.Surface) -> int:
+        sprite_id = self.sprite_ids.get(image)
+        if sprite_id is None:
+            sprite_id = len(self.sprites)
+            self.sprite_ids[image] = sprite_id
+            self.sprites.append(image)
+            self.images.append([None] * ROTATION_STEPS)
+        return sprite_id
+
+    def add(self, position: Vector, velocity: Vector, rotation: float, owner, damage: float, lifetime: float, image: pygame.Surface) -> None:
+        if not self.free:
+            self.grow()
+
+        index = self.free.pop()
+        self.position[index] = position.x, position.y
+        self.velocity[index] = velocity.x, velocity.y
+        self.rotation[index] = rotation
+        self.age[index] = 0
+        self.lifetime[index] = lifetime
+        self.damage[index] = damage
+        self.faction[index] = owner.faction
+        self.sprite[index] = self.get_sprite_id(image)
+        self.alive[index] = True
+        self.owners[index] = owner
+
+    def remove(self, indices) -> None:
+        self.alive[indices] = False
+        for index in np.atleast_1d(indices).tolist():
+            self.owners[index] = None
+            self.free.append(index)
+
+    def clear(self) -> None:
+        self.remove(np.flatnonzero(self.alive))
+
+    def update(self, delta_time: float) -> None:
+        indices = np.flatnonzero(self.alive)
+        if not len(indices):
+            return
+
+        # Move bullets
+        self.position[indices] += self.velocity[indices] * delta_time
+        self.age[indices] += delta_time
+
+        # Remove bullets that have run out of time or have left the loaded chunks
+        position = self.position[indices]
+        expired = self.age[indices] > self.lifetime[indices]
+
+        window = game.CHUNKS.window
+        if window is not None:
+            expired |= ((position[:, 0] < window[0] * game.CHUNK_SIZE) | (position[:, 0] >= (window[2] + 1) * game.CHUNK_SIZE) |
+                        (position[:, 1] < window[1] * game.CHUNK_SIZE) | (position[:, 1] >= (window[3] + 1) * game.CHUNK_SIZE))
+
+        if expired.any():
+            self.remove(indices[expired])
+            indices = indices[~expired]
+            position = position[~expired]
+
+        if len(indices):
+            self.collide(indices, position, delta_time)
+
+    def collide(self, indices: np.ndarray, position: np.ndarray, delta_time: float) -> None:
+        """Checks the path each bullet moved along this frame against the loaded ships, missiles, station cannons and asteroids
+        \nEach bullet hits the first target along it's path, so hits don't depend on the frame rate"""
+
+        # Path of each bullet this frame
+        movement = self.velocity[indices] * delta_time
+        start = position - movement
+        reach = float(np.sqrt((movement**2).sum(axis=1).max()))  # Longest path, targets look this much further for bullets
+
+        # Sort bullets by the spatial hash cell they end in, so the bullets in a cell are a slice of `order`
+        cell_size = game.CELL_SIZE
+        cells = np.floor(position / cell_size).astype(np.int64)
+        keys = cells[:, 1] * 0x100000000 + cells[:, 0]  # Row major, so the cells in a row are next to each other
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        # The cells of every bullet are used as a quick rejection for every target
+        occupied = set(zip(cells[:, 0].tolist(), cells[:, 1].tolist()))
+
+        def get_candidates(x: float, y: float, radius: float) -> np.ndarray:
+            """Returns the positions in `indices` of the bullets that end in the cells that the square around (x, y) overlaps"""
+            min_x, max_x = int((x - radius) // cell_size), int((x + radius) // cell_size)
+            slices = []
+            for cell_y in range(int((y - radius) // cell_size), int((y + radius) // cell_size) + 1):
+                if not any((cell_x, cell_y) in occupied for cell_x in range(min_x, max_x + 1)):
+                    continue
+
+                start_index = np.searchsorted(sorted_keys, cell_y * 0x100000000 + min_x, side="left")
+                end_index = np.searchsorted(sorted_keys, cell_y * 0x100000000 + max_x, side="right")
+                slices.append(order[start_index:end_index])
+
+            if not slices:
+                return order[:0]
+            return np.concatenate(slices) if len(slices) > 1 else slices[0]
+
+        # Every (bullet, target) hit, with how far along the bullet's path (0 to 1) the hit was
+        hit_bullets: list[np.ndarray] = []
+        hit_times: list[np.ndarray] = []
+        hit_targets: list[np.ndarray] = []
+        targets = []
+
+        chunks = game.CHUNKS
+        for target in chunks.get_entities(Ship, Missile, StationCannon):
+            x, y = target.position.x, target.position.y
+
+            if isinstance(target, Ship):
+                radius = 35 if target.shield else 29
+            else:
+                radius = 20
+
+            candidates = get_candidates(x, y, radius + reach)
+            if not len(candidates):
+                continue
+
+            # Make sure the bullet's faction can hit the target
+            candidates = candidates[(self.faction[indices[candidates]] & target.hittable_by) != 0]
+
+            # Time the path enters the target's circle, |start + movement * t - target| = radius
+            offset = start[candidates] - (x, y)
+            path = movement[candidates]
+            a = (path**2).sum(axis=1)
+            b = 2 * (offset * path).sum(axis=1)
+            c = (offset**2).sum(axis=1) - radius * radius
+            discriminant = b*b - 4*a*c
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                times = np.where(c <= 0, 0, (-b - np.sqrt(np.maximum(discriminant, 0))) / (2*a))
+            hits = (c <= 0) | ((discriminant >= 0) & (a > 0) & (times >= 0) & (times <= 1))
+
+            if hits.any():
+                hit_bullets.append(candidates[hits])
+                hit_times.append(times[hits])
+                hit_targets.append(np.full(hits.sum(), len(targets)))
+                targets.append(target)
+
+        # Bullets are destroyed when they hit an asteroid
+        for asteroid in list(self.asteroid_masks):
+            if asteroid not in chunks.entities:
+                del self.asteroid_masks[asteroid]
+
+        for asteroid in chunks.get_entities(Asteroid):
+            x, y = asteroid.position.x, asteroid.position.y
+            candidates = get_candidates(x, y, asteroid.radius + reach)
+            candidates = candidates[(self.faction[indices[candidates]] & asteroid.hittable_by) != 0]
+            if not len(candidates):
+                continue
+
+            # Only paths that pass inside the asteroid's radius need to be checked against it's pixels
+            offset = start[candidates] - (x, y)
+            path = movement[candidates]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                closest = np.clip(np.nan_to_num(-(offset * path).sum(axis=1) / (path**2).sum(axis=1)), 0, 1)
+            closest_offset = offset + path * closest[:, None]
+            candidates = candidates[(closest_offset**2).sum(axis=1) < asteroid.radius * asteroid.radius]
+            if not len(candidates):
+                continue
+
+            mask = self.asteroid_masks.get(asteroid)
+            if mask is None:
+                mask = pygame.surfarray.array_alpha(asteroid.image) > 127
+                self.asteroid_masks[asteroid] = mask
+            width, height = mask.shape
+
+            # Check points every 2 units along each path against the asteroid's pixels
+            times = np.linspace(0, 1, max(2, int(reach / 2) + 2))
+            points = start[candidates, None, :] + movement[candidates, None, :] * times[None, :, None]
+            pixel = np.floor(points - (x - width/2, y - height/2)).astype(np.int64)
+            inside = (pixel[..., 0] >= 0) & (pixel[..., 0] < width) & (pixel[..., 1] >= 0) & (pixel[..., 1] < height)
+            solid = np.zeros(inside.shape, dtype=bool)
+            solid[inside] = mask[pixel[..., 0][inside], pixel[..., 1][inside]]
+
+            hits = solid.any(axis=1)
+            if hits.any():
+                hit_bullets.append(candidates[hits])
+                hit_times.append(times[solid[hits].argmax(axis=1)])
+                hit_targets.append(np.full(hits.sum(), len(targets)))
+                targets.append(asteroid)
+
+        if not hit_bullets:
+            return
+
+        # Resolve the hits in the order they happened along each bullet's path
+        hit_bullets = np.concatenate(hit_bullets)
+        hit_times = np.concatenate(hit_times)
+        hit_targets = np.concatenate(hit_targets)
+        hit_order = np.argsort(hit_times, kind="stable")
+
+        for bullet, time, target_index in zip(hit_bullets[hit_order].tolist(), hit_times[hit_order].tolist(), hit_targets[hit_order].tolist()):
+            index = int(indices[bullet])
+            target = targets[target_index]
+            owner = self.owners[index]
+
+            # Bullet might have already hit something, or target might have been destroyed by a previous bullet
+            if not self.alive[index] or target not in chunks.entities:
+                continue
+
+            if isinstance(target, Asteroid):
+                hit_position = start[bullet] + movement[bullet] * time
+                effects.damage(Vector(float(hit_position[0]), float(hit_position[1])), float(self.damage[index]))
+            elif isinstance(target, Missile):
+                target.explode(target.explode_radius)
+            else:
+                target.damage(float(self.damage[index]), owner)
+            self.remove(index)
+
+    def get_image(self, sprite_id: int, step: int) -> pygame.Surface:
+        image = self.images[sprite_id][step]
+        if image is None:
+            image = sprites.get_scaled_image(self.sprites[sprite_id], game.ZOOM)
+            image = pygame.transform.rotate(image, math.degrees(step * 2 * math.pi / ROTATION_STEPS))
+            self.images[sprite_id][step] = image
+        return image
+
+    def draw(self, win: RenderQueue, focus_point: Vector) -> None:
+        indices = np.flatnonzero(self.alive)
+        if not len(indices):
+            return
+
+        # Rotated images are only valid for one zoom bucket
+        if self.images_zoom != sprites.get_zoom_bucket(game.ZOOM):
+            self.images_zoom = sprites.get_zoom_bucket(game.ZOOM)
+            self.images = [[None] * ROTATION_STEPS for _ in self.sprites]
+
+        # Only draw bullets that are on the screen
+        screen_position = (self.position[indices] - (focus_point.x, focus_point.y)) * game.ZOOM + (game.CENTRE_POINT.x, game.CENTRE_POINT.y)
+        margin = 20 * game.ZOOM
+        width, height = win.get_size()
+        visible = ((screen_position[:, 0] > -margin) & (screen_position[:, 0] < width + margin) &
+                   (screen_position[:, 1] > -margin) & (screen_position[:, 1] < height + margin))
+        indices, screen_position = indices[visible], screen_position[visible]
+
+        steps = np.round(self.rotation[indices] * ROTATION_STEPS / (2 * math.pi)).astype(np.int64) % ROTATION_STEPS
+
+        get_image = self.get_image
+        blits = []
+        for sprite_id, step, (x, y) in zip(self.sprite[indices].tolist(), steps.tolist(), screen_position.tolist()):
+            image = get_image(sprite_id, step)
+            blits.append((image, (round(x - image.get_width()/2), round(y - image.get_height()/2))))
+
+        win.fblits(blits)
@@ -0,0 +1,158 @@
+"""
+This file has the SpatialHash, used for collision and proximity queries
+
+The hash is a grid of cells, much smaller than chunks, each cell stores the loaded entities that overlap it
+Entities are stored in every cell that their bounding circle's square overlaps
+"""
+
+from __future__ import annotations
+from objects import Vector, Object
+import game
+import math
+
+
+
+def get_entry_time(start: Vector, end: Vector, position: Vector, radius: float) -> float | None:
+    """Returns how far along the line from `start` to `end` (0 to 1) it enters the circle at `position`, or None if it misses the circle"""
+    dx, dy = end.x - start.x, end.y - start.y
+    offset_x, offset_y = start.x - position.x, start.y - position.y
+
+    # Solve |start + (end - start) * t - position| = radius
+    a = dx*dx + dy*dy
+    b = 2 * (offset_x*dx + offset_y*dy)
+    c = offset_x*offset_x + offset_y*offset_y - radius*radius
+
+    if c <= 0:
+        return 0  # Starts inside the circle
+    discriminant = b*b - 4*a*c
+    if a == 0 or discriminant < 0:
+        return None
+
+    time = (-b - math.sqrt(discriminant)) / (2*a)
+    return time if 0 <= time <= 1 else None
+
+
+
+class SpatialHash():
+    __slots__ = ("cell_size", "cells", "bounds")
+    def __init__(self, cell_size: float = game.CELL_SIZE) -> None:
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], set[Object]] = {}
+        self.bounds: dict[Object, tuple[int, int, int, int]] = {}  # The cells each entity is in (min x, min y, max x, max y)
+
+    def get_bounds(self, entity: Object) -> tuple[int, int, int, int]:
+        radius = entity.radius
+        cell_size = self.cell_size
+        return (int((entity.position.x - radius) // cell_size), int((entity.position.y - radius) // cell_size),
+                int((entity.position.x + radius) // cell_size), int((entity.position.y + radius) // cell_size))
+
+    def insert(self, entity: Object) -> None:
+        bounds = self.get_bounds(entity)
+        self.bounds[entity] = bounds
+
+        for y in range(bounds[1], bounds[3] + 1):
+            for x in range(bounds[0], bounds[2] + 1):
+                cell = self.cells.get((x, y))
+                if cell is None:
+                    self.cells[(x, y)] = {entity}
+                else:
+                    cell.add(entity)
+
+    def remove(self, entity: Object) -> None:
+        bounds = self.bounds.pop(entity)
+
+        for y in range(bounds[1], bounds[3] + 1):
+            for x in range(bounds[0], bounds[2] + 1):
+                cell = self.cells[(x, y)]
+                cell.remove(entity)
+                if not cell:
+                    del self.cells[(x, y)]
+
+    # optimized
+    def move(self, entity: Object) -> None:
+        """Updates the cells of an entity that has moved, only changes the cells if the entity has moved into a different cell"""
+        if self.get_bounds(entity) != self.bounds[entity]:
+            self.remove(entity)
+            self.insert(entity)
+
+    def get_cell_entities(self, min_x: float, min_y: float, max_x: float, max_y: float) -> set[Object]:
+        """Returns the entities in every cell that overlaps the rectangle"""
+        cell_size = self.cell_size
+        cells = self.cells
+        entities = set()
+
+        for y in range(int(min_y // cell_size), int(max_y // cell_size) + 1):
+            for x in range(int(min_x // cell_size), int(max_x // cell_size) + 1):
+                cell = cells.get((x, y))
+                if cell:
+                    entities.update(cell)
+
+        return entities
+
+    def query_radius(self, position: Vector, radius: float, types: tuple[type, ...] = ()) -> list[Object]:
+        """Returns the entities whose bounding circle overlaps the circle at `position`
+        \nIf `types` is given, only entities that are an instance of one of `types` are returned"""
+        x, y = position.x, position.y
+        entities = []
+
+        for entity in self.get_cell_entities(x - radius, y - radius, x + radius, y + radius):
+            if types and not isinstance(entity, types):
+                continue
+
+            distance = radius + entity.radius
+            if (entity.position.x - x)**2 + (entity.position.y - y)**2 < distance * distance:
+                entities.append(entity)
+
+        return entities
+
+    def query_aabb(self, rect: tuple[float, float, float, float], types: tuple[type, ...] = ()) -> list[Object]:
+        """Returns the entities whose bounding square overlaps `rect` (x, y, width, height)
+        \nIf `types` is given, only entities that are an instance of one of `types` are returned"""
+        x, y, width, height = rect
+        entities = []
+
+        for entity in self.get_cell_entities(x, y, x + width, y + height):
+            if types and not isinstance(entity, types):
+                continue
+
+            radius = entity.radius
+            if (entity.position.x + radius > x and entity.position.x - radius < x + width and
+                entity.position.y + radius > y and entity.position.y - radius < y + height):
+                entities.append(entity)
+
+        return entities
+
+    def query_segment(self, start: Vector, end: Vector, types: tuple[type, ...] = (), radius: float = 0) -> list[Object]:
+        """Returns the entities whose bounding circle overlaps the line from `start` to `end`, with thickness `radius`
+        \nIf `types` is given, only entities that are an instance of one of `types` are returned"""
+        dx = end.x - start.x
+        dy = end.y - start.y
+        length_squared = dx*dx + dy*dy
+
+        # Walk along the line half a cell at a time, getting every cell within radius of the line
+        # Every point on the line is within a quarter of a cell from a step
+        steps = int(math.sqrt(length_squared) / (self.cell_size / 2)) + 1
+        step_radius = radius + self.cell_size / 4
+        candidates = set()
+        for step in range(steps + 1):
+            x = start.x + dx * step / steps
+            y = start.y + dy * step / steps
+            candidates.update(self.get_cell_entities(x - step_radius, y - step_radius, x + step_radius, y + step_radius))
+
+        entities = []
+        for entity in candidates:
+            if types and not isinstance(entity, types):
+                continue
+
+            # Closest point on the line to the entity
+            if length_squared:
+                t = ((entity.position.x - start.x) * dx + (entity.position.y - start.y) * dy) / length_squared
+                t = min(1, max(0, t))
+            else:
+                t = 0
+
+            distance = radius + entity.radius
+            if (start.x + dx*t - entity.position.x)**2 + (start.y + dy*t - entity.position.y)**2 < distance * distance:
+                entities.append(entity)
+
+        return entities
@@ -0,0 +1,290 @@
+"""
+This file has caches for data that only depends on a sprite, so it is only made once and shared by every entity using the sprite
+This includes: Cache, get_mask, get_scaled_image, get_rotated_image, draw_large, get_radius, get_distance_field, get_text_image
+
+Caches are keyed by the sprite's Surface (by identity), they have a memory limit and remove the least recently used items first
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+import math
+import numpy as np
+import pygame
+
+
+# Constants are kept here, not in game, as objects uses this file while game is being imported
+MASK_CACHE_BYTES = 4 * 1024 * 1024  # Memory limit of the collision mask cache
+MASK_ROTATION_STEPS = 64  # Number of rotations cached for each rotated collision mask
+SPRITE_CACHE_BYTES = 32 * 1024 * 1024  # Memory limit of the rotated sprite cache
+SCALED_CACHE_BYTES = 32 * 1024 * 1024  # Memory limit of the scaled sprite cache
+TILE_CACHE_BYTES = 32 * 1024 * 1024  # Memory limit of the cache of scaled tiles of large sprites
+TILE_SIZE = 64  # Width and height of the tiles that large sprites are split into, in unscaled pixels
+LARGE_SPRITE_PIXELS = 1024 * 1024  # Sprites with more pixels than this once scaled are drawn in tiles
+SPRITE_ROTATION_STEPS = 128  # Number of rotations cached for each sprite, 256 is smoother but uses twice the memory
+ZOOM_STEPS = 16  # Number of zoom buckets each time the zoom doubles, sprites are at most 2.2% from their exact size
+DISTANCE_FIELD_STEP = 4  # Distance between samples in a distance field, in game units
+DISTANCE_FIELD_PADDING = 128  # How far a distance field extends past the edge of it's image
+TEXT_CACHE_BYTES = 8 * 1024 * 1024  # Memory limit of the rendered text cache
+
+
+
+class Cache():
+    """Least recently used cache, limited to `max_bytes` of memory"""
+    __slots__ = ("name", "max_bytes", "get_bytes", "items", "bytes", "hits", "misses")
+    def __init__(self, name: str, max_bytes: int, get_bytes) -> None:
+        self.name = name
+        self.max_bytes = max_bytes
+        self.get_bytes = get_bytes  # Function, Input - value, Returns - memory used by the value in bytes
+        self.items: OrderedDict = OrderedDict()  # key: (value, bytes), most recently used last
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, create):
+        """Returns the value for `key`, calls `create` to make the value if it isn't cached"""
+        item = self.items.get(key)
+        if item is not None:
+            self.hits += 1
+            self.items.move_to_end(key)
+            return item[0]
+
+        self.misses += 1
+        value = create()
+        size = self.get_bytes(value)
+        self.items[key] = (value, size)
+        self.bytes += size
+
+        # Remove least recently used items, the newest item is always kept
+        while self.bytes > self.max_bytes and len(self.items) > 1:
+            _, (_, removed_size) = self.items.popitem(last=False)
+            self.bytes -= removed_size
+
+        return value
+
+    def clear(self) -> None:
+        self.items.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self) -> str:
+        hit_rate = self.hits / (self.hits + self.misses) if self.hits + self.misses else 0
+        return f"{self.name}: {hit_rate:.1%} hit rate, {self.misses} misses, {len(self.items)} items, {self.bytes / 1024:.0f} KB"
+
+
+
+def get_mask_bytes(mask: pygame.Mask) -> int:
+    width, height = mask.get_size()
+    return width * height // 8 + 1
+
+masks = Cache("Masks", MASK_CACHE_BYTES, get_mask_bytes)
+
+
+def get_rotation_step(rotation: float, steps: int = MASK_ROTATION_STEPS) -> int:
+    """Returns the rotation bucket of a rotation in radians"""
+    return round(rotation * steps / (2 * math.pi)) % steps
+
+
+def get_mask(image: pygame.Surface, rotation: float | None = None) -> pygame.Mask:
+    """Returns the collision mask of `image`, if `rotation` is given the mask is of the image rotated to the nearest rotation bucket"""
+    if rotation is None:
+        return masks.get(image, lambda: pygame.mask.from_surface(image))
+
+    step = get_rotation_step(rotation)
+    angle = math.degrees(step * 2 * math.pi / MASK_ROTATION_STEPS)
+    return masks.get((image, step), lambda: pygame.mask.from_surface(pygame.transform.rotate(image, angle)))
+
+
+
+
+def get_surface_bytes(surface: pygame.Surface) -> int:
+    return surface.get_pitch() * surface.get_height()
+
+scaled_images = Cache("Scaled sprites", SCALED_CACHE_BYTES, get_surface_bytes)
+rotated_images = Cache("Sprites", SPRITE_CACHE_BYTES, get_surface_bytes)
+
+
+def get_zoom_bucket(zoom: float) -> int:
+    """Returns the zoom bucket of a zoom, buckets are evenly spaced on a log scale"""
+    return round(math.log2(zoom) * ZOOM_STEPS)
+
+
+def get_scaled_image(image: pygame.Surface, zoom: float) -> pygame.Surface:
+    """Returns `image` scaled to the nearest zoom bucket
+    \nThe image is shared by every object using the same sprite, so it must not be drawn on"""
+    zoom_bucket = get_zoom_bucket(zoom)
+    return scaled_images.get((image, zoom_bucket), lambda: pygame.transform.scale_by(image, 2 ** (zoom_bucket / ZOOM_STEPS)))
+
+
+def get_rotated_image(image: pygame.Surface, zoom: float, rotation: float) -> pygame.Surface:
+    """Returns `image` scaled and rotated to the nearest zoom and rotation bucket
+    \nThe image is shared by every entity using the same sprite, so it must not be drawn on"""
+    zoom_bucket = get_zoom_bucket(zoom)
+    step = get_rotation_step(rotation, SPRITE_ROTATION_STEPS)
+
+    def create() -> pygame.Surface:
+        return pygame.transform.rotate(get_scaled_image(image, zoom), math.degrees(step * 2 * math.pi / SPRITE_ROTATION_STEPS))
+
+    return rotated_images.get((image, zoom_bucket, step), create)
+
+
+
+
+tiles = Cache("Tiles", TILE_CACHE_BYTES, get_surface_bytes)
+
+
+def is_large(image: pygame.Surface, zoom: float) -> bool:
+    """Returns True if `image` is too large to be scaled all at once at `zoom`, so should be drawn with draw_large"""
+    return image.get_width() * image.get_height() * zoom * zoom > LARGE_SPRITE_PIXELS
+
+
+def draw_large(win: pygame.Surface, image: pygame.Surface, centre: tuple[float, float], zoom: float) -> None:
+    """Draws `image` scaled to the nearest zoom bucket, with it's centre at `centre` on `win`
+    \nThe image is split into tiles, only the tiles on the screen are scaled and drawn"""
+    zoom_bucket = get_zoom_bucket(zoom)
+    scale = 2 ** (zoom_bucket / ZOOM_STEPS)
+    width, height = image.get_size()
+    left = round(centre[0] - width * scale / 2)
+    top = round(centre[1] - height * scale / 2)
+
+    # Tiles that overlap the visible part of win
+    clip = win.get_clip()
+    x_start = max(int((clip.left - left) / scale) // TILE_SIZE, 0)
+    x_end = min(int((clip.right - left) / scale) // TILE_SIZE, (width - 1) // TILE_SIZE)
+    y_start = max(int((clip.top - top) / scale) // TILE_SIZE, 0)
+    y_end = min(int((clip.bottom - top) / scale) // TILE_SIZE, (height - 1) // TILE_SIZE)
+
+    def create(rect: pygame.Rect) -> pygame.Surface:
+        # Tile edges are rounded the same way for neighbouring tiles, so there are no gaps between them
+        size = round(rect.right * scale) - round(rect.left * scale), round(rect.bottom * scale) - round(rect.top * scale)
+        return pygame.transform.scale(image.subsurface(rect), size)
+
+    blits = []
+    for y in range(y_start, y_end + 1):
+        for x in range(x_start, x_end + 1):
+            rect = pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE).clip(0, 0, width, height)
+            tile = tiles.get((image, zoom_bucket, x, y), lambda: create(rect))
+            blits.append((tile, (left + round(rect.left * scale), top + round(rect.top * scale))))
+
+    win.fblits(blits)
+
+
+
+radii: dict[pygame.Surface, float] = {}
+
+def get_radius(image: pygame.Surface) -> float:
+    """Returns the distance from the centre of `image` to the corner of it's furthest opaque pixel
+    \nA circle with this radius contains the image at any rotation"""
+    radius = radii.get(image)
+    if radius is None:
+        width, height = image.get_size()
+        x, y = np.nonzero(pygame.surfarray.array_alpha(image) > 127)
+
+        if len(x):
+            # Furthest pixel centre, then out to it's corner
+            radius = float(np.sqrt(((x + 0.5 - width/2)**2 + (y + 0.5 - height/2)**2).max())) + math.sqrt(0.5)
+        else:
+            radius = 0.0
+        radii[image] = radius
+
+    return radius
+
+
+
+class DistanceField():
+    """Signed distance from the edge of an image's opaque pixels, sampled on a grid
+    \nDistances are positive outside of the image and negative inside, normals point away from the image"""
+    __slots__ = ("distances", "normals", "origin", "step")
+    def __init__(self, image: pygame.Surface, step: int = DISTANCE_FIELD_STEP, padding: int = DISTANCE_FIELD_PADDING) -> None:
+        self.step = step
+        width, height = image.get_size()
+
+        # Grid of sample points (relative to the centre of the image) that covers the image and padding
+        self.origin = (-width/2 - padding, -height/2 - padding)
+        xs = np.arange(-padding, width + padding, step) + 0.5
+        ys = np.arange(-padding, height + padding, step) + 0.5
+
+        opaque = pygame.surfarray.array_alpha(image) > 127
+        x_pixels = xs.astype(np.int64)
+        y_pixels = ys.astype(np.int64)
+        x_inside = (x_pixels >= 0) & (x_pixels < width)
+        y_inside = (y_pixels >= 0) & (y_pixels < height)
+        inside = np.zeros((len(xs), len(ys)), dtype=bool)
+        inside[np.ix_(x_inside, y_inside)] = opaque[np.ix_(x_pixels[x_inside], y_pixels[y_inside])]
+
+        # The samples next to a sample on the other side of the edge
+        padded = np.pad(inside, 1, mode="edge")
+        neighbours_differ = ((padded[:-2, 1:-1] != inside) | (padded[2:, 1:-1] != inside) |
+                             (padded[1:-1, :-2] != inside) | (padded[1:-1, 2:] != inside))
+
+        points = np.stack(np.meshgrid(xs, ys, indexing="ij"), axis=-1).reshape(-1, 2)
+        distances = np.full(len(points), float(padding + max(width, height)))
+        flat_inside = inside.reshape(-1)
+
+        # Outside samples are measured to the nearest inside edge sample and vice versa
+        # The edge is half a step between the two samples
+        for is_inside, sign in ((False, 1), (True, -1)):
+            edge = points[(neighbours_differ & (inside != is_inside)).reshape(-1)]
+            indices = np.flatnonzero(flat_inside == is_inside)
+            if not len(edge):
+                continue
+
+            # |a - b|^2 = |a|^2 + |b|^2 - 2a.b, so the closest edge sample can be found with a matrix multiplication
+            edge_squared = (edge**2).sum(axis=1)
+            for start in range(0, len(indices), 4096):
+                batch = points[indices[start:start + 4096]]
+                squared = (batch**2).sum(axis=1)[:, None] + edge_squared[None, :] - 2 * (batch @ edge.T)
+                distances[indices[start:start + 4096]] = sign * (np.sqrt(np.maximum(squared.min(axis=1), 0)) - step/2)
+
+        self.distances = distances.reshape(len(xs), len(ys))
+        self.normals = np.stack(np.gradient(self.distances, step), axis=-1)
+
+    def get(self, position) -> tuple[float, float, float]:
+        """Returns the signed distance and the normal (x, y) at `position`, relative to the centre of the image"""
+        distances = self.distances
+        x = min(max((position.x - self.origin[0]) / self.step - 0.5, 0), distances.shape[0] - 1.001)
+        y = min(max((position.y - self.origin[1]) / self.step - 0.5, 0), distances.shape[1] - 1.001)
+        x_index, y_index = int(x), int(y)
+        x_fraction, y_fraction = x - x_index, y - y_index
+
+        # Bilinear interpolation of the four samples around the position
+        square = distances[x_index:x_index + 2, y_index:y_index + 2]
+        distance = ((square[0, 0] * (1 - x_fraction) + square[1, 0] * x_fraction) * (1 - y_fraction) +
+                    (square[0, 1] * (1 - x_fraction) + square[1, 1] * x_fraction) * y_fraction)
+
+        normal_x, normal_y = self.normals[round(x), round(y)]
+        length = math.hypot(normal_x, normal_y) or 1
+        return float(distance), float(normal_x / length), float(normal_y / length)
+
+
+distance_fields: dict[pygame.Surface, DistanceField] = {}
+
+def get_distance_field(image: pygame.Surface) -> DistanceField:
+    distance_field = distance_fields.get(image)
+    if distance_field is None:
+        distance_field = DistanceField(image)
+        distance_fields[image] = distance_field
+    return distance_field
+
+
+
+text_images = Cache("Text", TEXT_CACHE_BYTES, get_surface_bytes)
+fonts: dict[tuple[str, int], pygame.font.Font] = {}
+
+
+def get_font(name: str, size: int) -> pygame.font.Font:
+    """Returns the system font `name` at `size`, fonts are only loaded once"""
+    font = fonts.get((name, size))
+    if font is None:
+        font = pygame.font.SysFont(name, size)
+        fonts[(name, size)] = font
+    return font
+
+
+def get_text_image(font: str, size: int, text: str, colour: tuple[int, int, int], zoom: float = 1) -> pygame.Surface:
+    """Returns `text` rendered in the system font `font`, with `size` scaled to the nearest zoom bucket
+    \nThe image is shared by everything drawing the same text, so it must not be drawn on"""
+    if zoom != 1:
+        size = round(size * 2 ** (get_zoom_bucket(zoom) / ZOOM_STEPS))
+    return text_images.get((font, size, text, colour), lambda: get_font(font, size).render(text, True, colour).convert_alpha())
@@ -1,11 +1,11 @@
 from objects import Entity, Object, Vector, random_vector
 from aiship import Mother_Ship, Neutral_Ship_Cargo
 from weapons import Blaster
+from sprites import get_mask
 import effects
 import images
 import game
 import random
-import pygame
 
 
 
@@ -25,12 +25,8 @@ class Station(Object):
         self.selected_image = selected_image()
         self.load_default_image = image
         self.load_selected_image = selected_image
-        self.default_scale = game.ZOOM
-        self.selected_scale = game.ZOOM
-        self.scaled_default_image = pygame.transform.scale_by(self.default_image, game.ZOOM)
-        self.scaled_selected_image = pygame.transform.scale_by(self.selected_image, game.ZOOM)
 
-        self.mask = pygame.mask.from_surface(self.image)
+        self.mask = get_mask(self.image)
 
         self.width = self.image.get_width()
         self.height = self.image.get_height()
@@ -41,9 +37,7 @@ class Station(Object):
         super().__setstate__(state)
         self.default_image = self.load_default_image()
         self.selected_image = self.load_selected_image()
-        self.scaled_default_image = pygame.transform.scale_by(self.default_image, self.default_scale)
-        self.scaled_selected_image = pygame.transform.scale_by(self.selected_image, self.selected_scale)
-        self.mask = pygame.mask.from_surface(self.image)
+        self.mask = get_mask(self.image)
 
     def update(self, delta_time):
         super().update(delta_time)
@@ -70,19 +64,11 @@ class Station(Object):
         game.CHUNKS.add_entity(entity)
 
 
-    def get_zoomed_image(self):
+    def get_sprite(self):
         if game.player.closest_station == self:
-            if self.selected_scale != game.ZOOM:
-                # if self.scaled_image isn't the right scale -> recalculate the scaled_image
-                self.selected_scale = game.ZOOM
-                self.scaled_selected_image = pygame.transform.scale_by(self.selected_image, game.ZOOM)
-            return self.scaled_selected_image
+            return self.selected_image
         else:
-            if self.default_scale != game.ZOOM:
-                # if self.scaled_image isn't the right scale -> recalculate the scaled_image
-                self.default_scale = game.ZOOM
-                self.scaled_default_image = pygame.transform.scale_by(self.default_image, game.ZOOM)
-            return self.scaled_default_image
+            return self.default_image
 
 
 
@@ -111,6 +97,9 @@ class EnemyStation(Station):
 
 
 class StationCannon(Entity):
+    faction = game.STATION
+    hittable_by = game.PLAYER | game.NEUTRAL
+
     def __init__(self, position: Vector, health: int = 20, damage: int = 2, range: int = 800, level: int = 0, image=lambda: images.STATION_CANNON) -> None:
         super().__init__(position, velocity=Vector(0, 0), image=image)
         self.range = range
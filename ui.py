@@ -4,6 +4,7 @@ from station import Station, EnemyStation, FriendlyStation
 import aiship
 from aiship import Neutral_Ship_Cargo, Enemy_Ship, Drone_Enemy, Missile_Ship,  Mother_Ship, Neutral_Ship_Fighter # For commands
 import images
+import sprites
 import game
 import commands
 import math
@@ -33,25 +34,37 @@ class Bar():
         self.left_curve = -1 if flatten_left else curve
         self.right_curve = -1 if flatten_right else curve
 
+        # The bar and outline are drawn onto surfaces, the bar is only drawn again when it's width changes
+        self.bar_image = None
+        self.bar_image_width = None
+        self.outline_image = self.get_outline_image()
+
     def update(self, new_percent):
         """Updates the percentage of the bar, NOTE: percentage is from 0 to 1"""
         self.width = (self.original_width-self.outline_width*2) * min(1, new_percent)
 
-    def draw(self):
-        pygame.draw.rect(game.WIN, self.colour,
-                        rect=(self.x()+self.outline_width, self.y() - self.height/2 + self.outline_width, # bar position is middle left
-                              self.width, self.height-self.outline_width*2),
-
-                        border_top_left_radius=self.left_curve-self.outline_width, # - self.outline_width to be the same curve as the inside curve of the outline
-                        border_bottom_left_radius=self.left_curve-self.outline_width,
-                        border_top_right_radius=self.right_curve-self.outline_width,
-                        border_bottom_right_radius=self.right_curve-self.outline_width
-                        )
-
-        if self.outline_width:
-            pygame.draw.rect(game.WIN, self.outline_colour,
-                        rect=(self.x()           , self.y() - self.height/2, # bar position is middle left
-                              self.original_width, self.height),
+    def get_bar_image(self) -> pygame.Surface:
+        width = round(self.width)
+        if width != self.bar_image_width:
+            self.bar_image_width = width
+            self.bar_image = pygame.Surface((self.original_width, self.height), flags=pygame.SRCALPHA)
+            pygame.draw.rect(self.bar_image, self.colour,
+                            rect=(self.outline_width, self.outline_width, width, self.height-self.outline_width*2),
+
+                            border_top_left_radius=self.left_curve-self.outline_width, # - self.outline_width to be the same curve as the inside curve of the outline
+                            border_bottom_left_radius=self.left_curve-self.outline_width,
+                            border_top_right_radius=self.right_curve-self.outline_width,
+                            border_bottom_right_radius=self.right_curve-self.outline_width
+                            )
+        return self.bar_image
+
+    def get_outline_image(self) -> pygame.Surface | None:
+        if not self.outline_width:
+            return None
+
+        surf = pygame.Surface((self.original_width, self.height), flags=pygame.SRCALPHA)
+        pygame.draw.rect(surf, self.outline_colour,
+                        rect=(0, 0, self.original_width, self.height),
 
                         width=self.outline_width,
                         border_top_left_radius=self.left_curve,
@@ -59,6 +72,29 @@ class Bar():
                         border_top_right_radius=self.right_curve,
                         border_bottom_right_radius=self.right_curve
                         )
+        return surf
+
+    def draw(self):
+        position = (self.x(), self.y() - self.height/2)  # bar position is middle left
+        game.WIN.blit(self.get_bar_image(), position)
+        if self.outline_image:
+            game.WIN.blit(self.outline_image, position)
+
+
+class Label():
+    """Text that is only looked up in the text cache again when it changes"""
+    def __init__(self, font: str, size: int, colour=(255, 255, 255)) -> None:
+        self.font = font
+        self.size = size
+        self.colour = colour
+        self.text = None
+        self.image = None
+
+    def get_image(self, text: str) -> pygame.Surface:
+        if text != self.text:
+            self.text = text
+            self.image = sprites.get_text_image(self.font, self.size, text, self.colour)
+        return self.image
 
 
 class Image():
@@ -97,6 +133,17 @@ class MiniMap():
         self.entity_size = 3
         self.player_image = images.PLAYER_MINIMAP_IMAGE
 
+        # The entities are only drawn UPDATE_TIME seconds apart, in between the map is moved with the player
+        self.update_time = 1 / 20
+        self.last_update = -math.inf
+        self.surf = None
+        self.surf_position = Vector(0, 0)  # The player's position when the map was drawn
+
+        # The border uses a colorkey rather than alpha, so the transparent middle is quick to blit
+        self.border = pygame.Surface((self.width, self.height))
+        pygame.draw.rect(self.border, color=game.DARK_GREY, rect=(0, 0, self.width, self.height), width=self.border_width, border_radius=5)
+        self.border.set_colorkey(game.BLACK, pygame.RLEACCEL)
+
     def draw_entity(self, colour, entity, surf):
         if colour:
             pos = (((entity.position.x - game.player.position.x) / (game.LOAD_DISTANCE-1) / game.CHUNK_SIZE / 2 * self.draw_width) + (self.draw_width / 2),
@@ -106,11 +153,11 @@ class MiniMap():
 
     def get_entity_colour(self, entity):
 
-        # Changes colour based on type
-        if isinstance(entity, aiship.Enemy_Ship):
+        # Changes colour based on faction, then type
+        if entity.faction & game.ENEMY:
             self.entity_size = 3
             return self.enemy_colour
-        elif isinstance(entity, aiship.Neutral_Ship):
+        elif entity.faction & game.NEUTRAL:
             self.entity_size = 3
             return self.neutral_colour
         elif isinstance(entity, Asteroid):
@@ -120,28 +167,39 @@ class MiniMap():
             self.entity_size = 2
             return self.scrap_colour
 
-    def draw(self):
+    def draw_map(self):
         # Draws enemies in chunks
         surf = pygame.Surface((self.draw_width, self.draw_height))
 
-        for entity in filter(lambda entity: isinstance(entity, Station), game.CHUNKS.entities):
+        for entity in game.CHUNKS.get_entities(Station):
             # Blits station image, (game.LOAD_DISTANCE-1) so that entities do not vanish if near minimap edge
             station_image = images.ENEMY_STATION_ICON if isinstance(entity, EnemyStation) else images.FRIENDLY_STATION_ICON
             surf.blit(station_image, (((entity.position.x - entity.width/2 - game.player.position.x) / (game.LOAD_DISTANCE-1) / game.CHUNK_SIZE / 2 * self.draw_width) + (self.draw_width / 2),
                                       ((entity.position.y - entity.height/2 - game.player.position.y) / (game.LOAD_DISTANCE-1) / game.CHUNK_SIZE / 2 * self.draw_height) + (self.draw_height / 2)))
 
-        for entity in filter(lambda entity: not isinstance(entity, Station), game.CHUNKS.entities):
+        for entity in game.CHUNKS.get_entities(aiship.Enemy_Ship, aiship.Neutral_Ship, Asteroid, Scrap):
             self.draw_entity(self.get_entity_colour(entity), entity, surf)
 
-        game.WIN.blit(surf, (self.border_width, self.border_width))
+        return surf
+
+    def draw(self):
+        if time.perf_counter() - self.last_update > self.update_time:
+            self.last_update = time.perf_counter()
+            self.surf = self.draw_map()
+            self.surf_position = game.player.position
+
+        # Moves the map by how far the player has moved since it was drawn, so it moves smoothly
+        offset = (game.player.position - self.surf_position) / (game.LOAD_DISTANCE-1) / game.CHUNK_SIZE / 2
+        clip = game.WIN.get_clip()
+        game.WIN.set_clip((self.x + self.border_width, self.y + self.border_width, self.draw_width, self.draw_height))
+        game.WIN.blit(self.surf, (self.x + self.border_width - offset.x * self.draw_width, self.y + self.border_width - offset.y * self.draw_height))
+        game.WIN.set_clip(clip)
 
         # Draws border
-        pygame.draw.rect(game.WIN, color=game.DARK_GREY, rect=(
-            self.x, self.y, self.width, self.height
-        ), width=self.border_width, border_radius=5)
+        game.WIN.blit(self.border, (self.x, self.y))
 
         # Draws player image
-        image = pygame.transform.rotate(self.player_image, math.degrees(game.player.rotation))
+        image = sprites.get_rotated_image(self.player_image, 1, game.player.rotation)
         game.WIN.blit(image, ((self.width / 2) - (image.get_width() / 2), (self.height / 2) - (image.get_height() / 2)))
 
 
@@ -155,6 +213,10 @@ class Hotbar():
 
         self.images = [pygame.transform.scale_by(images.BULLET, 2), pygame.transform.scale_by(images.GATLING_BULLET, 2), pygame.transform.scale_by(images.SNIPER_BULLET, 2), self.get_laser_image()]
 
+        # The hotbar is only drawn again when the selected weapon changes
+        self.surf = None
+        self.surf_weapon = None
+
     def get_laser_image(self):
         image = pygame.Surface((20, 36), flags=pygame.SRCALPHA)
         for step in range(6):
@@ -162,7 +224,8 @@ class Hotbar():
         pygame.draw.rect(image, (81, 200, 252), (6, 5, 8, 26), border_radius=4)
         return image
 
-    def draw(self):
+    def draw_hotbar(self):
+        surf = pygame.Surface((self.number*(self.size+self.gap) - self.gap, self.size), flags=pygame.SRCALPHA)
         for i in range(self.number):
 
             if i == game.WEAPON_SELECTED:
@@ -171,12 +234,22 @@ class Hotbar():
             else:
                 colour = game.DARK_GREY
 
-            x = game.CENTRE_POINT.x + self.gap/2 + (i-self.number/2)*(self.size+self.gap)
-            y = game.HEIGHT - self.height
-            pygame.draw.rect(game.WIN, colour, (x, y, self.size, self.size), width=6, border_radius=7)
+            x = i*(self.size+self.gap)
+            pygame.draw.rect(surf, colour, (x, 0, self.size, self.size), width=6, border_radius=7)
 
             image = self.images[i]
-            game.WIN.blit(image, (x+self.size/2-image.get_width()/2, y+self.size/2-image.get_height()/2))
+            surf.blit(image, (x+self.size/2-image.get_width()/2, self.size/2-image.get_height()/2))
+
+        return surf
+
+    def draw(self):
+        if game.WEAPON_SELECTED != self.surf_weapon:
+            self.surf_weapon = game.WEAPON_SELECTED
+            self.surf = self.draw_hotbar()
+
+        x = game.CENTRE_POINT.x + self.gap/2 - self.number/2*(self.size+self.gap)
+        y = game.HEIGHT - self.height
+        game.WIN.blit(self.surf, (x, y))
 
 
 
@@ -189,8 +262,9 @@ class Console():
         self.input_text = ""
         self.chat_history = []
 
-        self.text_input_font = pygame.font.SysFont("consolas", 50)
-        self.chat_history_font = pygame.font.SysFont("consolas", 35)
+        self.font = "consolas"
+        self.text_input_font_size = 50
+        self.chat_history_font_size = 35
 
         self.commands_colour = (255, 204, 0)
         self.old_commands_colour = (105, 89, 26)
@@ -473,13 +547,17 @@ class Console():
             pygame.draw.rect(game.WIN, game.WHITE, (0, height - self.text_input_height, width, self.text_input_height))
 
             # Renders input text
-            text_surface = self.text_input_font.render("/" + self.input_text, True, game.BLACK)
+            text_surface = sprites.get_text_image(self.font, self.text_input_font_size, "/" + self.input_text, game.BLACK)
             game.WIN.blit(text_surface, (self.left_text_padding, height - self.text_input_height + (0 if "|" in self.input_text else 2)))
 
             # Loops through all previous commands and displays them above
             for i, command in enumerate(self.chat_history):
-                text_surface = self.chat_history_font.render(command[0], True, command[1])
-                game.WIN.blit(text_surface, (self.left_text_padding, height - self.text_input_height - ((i + 1) * self.chat_history_gap)))
+                y = height - self.text_input_height - ((i + 1) * self.chat_history_gap)
+                if y < -self.chat_history_gap:
+                    break  # The rest of the history is above the screen
+
+                text_surface = sprites.get_text_image(self.font, self.chat_history_font_size, command[0], tuple(command[1]))
+                game.WIN.blit(text_surface, (self.left_text_padding, y))
 
             # Needed since draw() is called in the while loop
             pygame.display.update()
@@ -513,6 +591,10 @@ class AdjustableText():
 
         self.low_letters = ["g", "j", "q", "p", "y"]
 
+        # The words are only rendered again when the text or it's position changes
+        self.blits = []
+        self.blits_key = None
+
     def change_text(self, text: str) -> None:
         self.words = text.split(" ")
 
@@ -551,10 +633,12 @@ class AdjustableText():
         return render_list
 
     def draw(self) -> None:
-        render_list = self.render_words()
+        key = (tuple(self.words), self.top_x, self.top_y, self.bottom_x, self.bottom_y)
+        if key != self.blits_key:
+            self.blits_key = key
+            self.blits = [(self.font.render(word, self.colour)[0].convert_alpha(), (x, y)) for x, y, word in self.render_words()]
 
-        for element in render_list:
-            self.font.render_to(game.WIN, (element[0], element[1]), text=element[2], fgcolor=self.colour)
+        game.WIN.fblits(self.blits)
 
 
 
@@ -570,8 +654,9 @@ class MissionOverview():
         self.font = freetype.SysFont("bahnschrift", 30)
 
         self.claim_reward_label, (*_, self.claim_reward_label_width, self.claim_reward_label_height) = self.font.render("Claim Reward", (255, 182, 36))
-        self.mission_label = self.font.render("Mission", (255, 255, 255))[0]
-        self.kill_mission_label = self.font.render("Kill Mission", (255, 255, 255))[0]
+        self.claim_reward_label = self.claim_reward_label.convert_alpha()
+        self.mission_label = self.font.render("Mission", (255, 255, 255))[0].convert_alpha()
+        self.kill_mission_label = self.font.render("Kill Mission", (255, 255, 255))[0].convert_alpha()
 
         self.title_label = self.mission_label
 
@@ -579,11 +664,15 @@ class MissionOverview():
         self.info_text = AdjustableText(self.x() - self.width + 10, self.y() - self.height/4 - 50, self.x() - 10, self.y() + self.height/4 - 40, "bahnschrift", 30, (255, 255, 255), info)
 
         self.progress_text = "0/0"
-        self.progress_label = self.font.render(self.progress_text, (255, 255, 255))[0]
+        self.progress_label = self.font.render(self.progress_text, (255, 255, 255))[0].convert_alpha()
         self.progress_bar = Bar(lambda: self.x() - self.width + 10, lambda: self.y() + self.height/3 + 20, self.width - 20, 50, (0, 0, 255), 2, (0, 0, 0), 5)
 
+        self.background = pygame.Surface((self.width, self.height))
+        pygame.draw.rect(self.background, game.DARK_GREY, (0, 0, self.width, self.height), border_radius=7)
+        self.background.set_colorkey(game.BLACK)
+
     def draw(self):
-        pygame.draw.rect(game.WIN, game.DARK_GREY, (self.x() - self.width, self.y() - (self.height/2), self.width, self.height), border_radius=7)
+        game.WIN.blit(self.background, (self.x() - self.width, self.y() - (self.height/2)))
 
         if game.CURRENT_MISSION_SLOT != None:
             data = game.MISSIONS[game.CURRENT_MISSION_SLOT]
@@ -598,7 +687,7 @@ class MissionOverview():
                 progress_text = f"{data["current_number"]}/{data["number"]}"
                 if progress_text != self.progress_text:
                     self.progress_text = progress_text
-                    self.progress_label = self.font.render(self.progress_text, (255, 255, 255))[0]
+                    self.progress_label = self.font.render(self.progress_text, (255, 255, 255))[0].convert_alpha()
                 game.WIN.blit(self.progress_label, (self.x()-self.progress_label.get_width()/2-self.width/2, self.y()+self.height/4-self.progress_label.get_height()/2))
 
                 self.progress_bar.update(data["current_number"]/data["number"])
@@ -650,9 +739,14 @@ canvas = Canvas()
 
 
 WIN = game.WIN
-font = pygame.font.SysFont("bahnschrift", 30)
-font2 = pygame.font.SysFont("bahnschrift", 50)
-font3 = pygame.font.SysFont("consolas", 20)
+fps_label = Label("bahnschrift", 30)
+score_label = Label("bahnschrift", 50, (255, 10, 10))
+health_label = Label("bahnschrift", 30)
+armour_label = Label("bahnschrift", 30)
+shield_label = Label("bahnschrift", 30)
+boost_label = Label("bahnschrift", 30)
+speed_label = Label("bahnschrift", 30)
+debug_labels = [Label("consolas", 20) for _ in range(13)]
 
 
 def cursor_highlighting():
@@ -660,8 +754,8 @@ def cursor_highlighting():
     cursor_pos = (Vector(x, y) - game.CENTRE_POINT) / game.ZOOM + game.player.position
     canvas.cursor_image.image = images.CURSOR
     game.player.cursor_highlighted = False
-    for entity in game.CHUNKS.get_chunk((cursor_pos // game.CHUNK_SIZE).to_tuple()).entities:
-        if isinstance(entity, aiship.AI_Ship) and (cursor_pos - entity.position).magnitude() < 32:
+    for entity in game.CHUNKS.spatial.query_radius(cursor_pos, 32, (aiship.AI_Ship,)):
+        if (cursor_pos - entity.position).magnitude() < 32:
             canvas.cursor_image.image = images.CURSOR_HIGHLIGHTED
             game.player.cursor_highlighted = True
             game.player.aiming_enemy = entity
@@ -672,34 +766,36 @@ def update_closest_station():
     """Updates the current closest station"""
     closest_station = None
     distance = math.inf
-    chunk_pos = game.player.position // game.CHUNK_SIZE
-    for cy in range(chunk_pos.y-1, chunk_pos.y+2):
-        for cx in range(chunk_pos.x-1, chunk_pos.x+2):
-            for entity in game.CHUNKS.get_chunk((cx, cy)).entities:
-                if isinstance(entity, FriendlyStation):
-                    dist = game.player.distance_to(entity)
-                    if dist < 500 and dist < distance:
-                        distance = dist
-                        closest_station = entity
+    for entity in game.CHUNKS.spatial.query_radius(game.player.position, 500, (FriendlyStation,)):
+        dist = game.player.distance_to(entity)
+        if dist < 500 and dist < distance:
+            distance = dist
+            closest_station = entity
 
     if closest_station:
-        # Draw E popup
-        size = 50
-        x = 0
-        y = 360
-        border = 7
+        game.WIN.blit(station_popup, (0, 360))
+
+    game.player.closest_station = closest_station
 
-        # Draw background
-        pygame.draw.rect(game.WIN, game.MEDIUM_GREY, (x+border, y+border, size-2*border, size-2*border))
 
-        # Draw outline
-        pygame.draw.rect(game.WIN, game.DARK_GREY, (x, y, size, size), width=border, border_radius=5)
+def get_station_popup() -> pygame.Surface:
+    """Returns the E popup shown when near a station"""
+    size = 50
+    border = 7
+    surf = pygame.Surface((size, size), flags=pygame.SRCALPHA)
 
-        # Draw letter E
-        label = font.render("E", True, (255, 255, 255))
-        game.WIN.blit(label, (x+size/2-label.get_width()/2, y+size/2-font.get_height()/2))
+    # Draw background
+    pygame.draw.rect(surf, game.MEDIUM_GREY, (border, border, size-2*border, size-2*border))
 
-    game.player.closest_station = closest_station
+    # Draw outline
+    pygame.draw.rect(surf, game.DARK_GREY, (0, 0, size, size), width=border, border_radius=5)
+
+    # Draw letter E
+    label = sprites.get_text_image("bahnschrift", 30, "E", (255, 255, 255))
+    surf.blit(label, (size/2-label.get_width()/2, size/2-sprites.get_font("bahnschrift", 30).get_height()/2))
+    return surf
+
+station_popup = get_station_popup()
 
 
 bars = 20
@@ -793,58 +889,36 @@ def draw(delta_time):
 
     canvas.draw()
 
-    label = font.render(f"FPS: {round(get_average_fps(delta_time))}", True, (255, 255, 255))
-    WIN.blit(label, (game.WIDTH - 300, 8))
+    # Labels are only rendered again when their text changes
+    WIN.blit(fps_label.get_image(f"FPS: {round(get_average_fps(delta_time))}"), (game.WIDTH - 300, 8))
 
-    label = font2.render(f"SCORE: {game.SCORE}", True, (255, 10, 10))
+    label = score_label.get_image(f"SCORE: {game.SCORE}")
     WIN.blit(label, (game.WIDTH/2 - label.get_width()/2, 100))
 
     if game.DEBUG_SCREEN:
-        label = font3.render(f"Position: {round(game.LAST_PLAYER_POS)}", True, (255, 255, 255))
-        WIN.blit(label, (8, 8))
-
-        label = font3.render(f"Chunk Position: {game.LAST_PLAYER_POS // game.CHUNK_SIZE}", True, (255, 255, 255))
-        WIN.blit(label, (8, 38))
-
-        label = font3.render(f"Angle: {round(math.degrees(game.player.rotation) - 180) % 360 - 180}", True, (255, 255, 255))
-        WIN.blit(label, (8, 68))
-
-        label = font3.render(f"Zoom: {round(game.ZOOM, 3)}", True, (255, 255, 255))
-        WIN.blit(label, (8, 98))
-
-        label = font3.render(f"Mouse Pos: {pygame.mouse.get_pos()}", True, (255, 255, 255))
-        WIN.blit(label, (8, 128))
-
         cpu_usage, memory_usage, cpu_bar, memory_bar = get_usage(delta_time)
-
-        label = font3.render(f"CPU Usage: |{cpu_bar}| {cpu_usage:.1f}%", True, (255, 255, 255))
-        WIN.blit(label, (8, 158))
-
-        label = font3.render(f"Memory Usage: |{memory_bar}| {memory_usage:.1f}%", True, (255, 255, 255))
-        WIN.blit(label, (8, 188))
-
         minimum = get_minimum_fps(delta_time)
 
-        label = font3.render(f"Minimum FPS: {round(minimum)}", True, (255, 255, 255))
-        WIN.blit(label, (8, 218))
-
-        label = font3.render(f"Seed: {game.SEED}", True, (255, 255, 255))
-        WIN.blit(label, (8, 248))
-
-        label = font3.render(f"Difficulty: {game.CURRENT_SHIP_LEVEL}", True, (255, 255, 255))
-        WIN.blit(label, (8, 278))
-
-    label = font.render(f"{round(game.player.health)} | {game.MAX_PLAYER_HEALTH}", True, (255, 255, 255))
-    WIN.blit(label, (game.WIDTH/2-193, game.HEIGHT-114))
-
-    label = font.render(f"{round(game.player.armour)}", True, (255, 255, 255))
-    WIN.blit(label, (game.WIDTH/2+10, game.HEIGHT-114))
-
-    label = font.render(f"{round(game.player.shield)} | {round(game.player.max_shield)}", True, (255, 255, 255))
-    WIN.blit(label, (108, game.HEIGHT-226))
-
-    label = font.render(f"{round(game.player.boost_amount)} | {game.MAX_BOOST_AMOUNT}", True, (255, 255, 255))
-    WIN.blit(label, (108, game.HEIGHT-170))
-
-    label = font.render(f"{round(game.player.velocity.magnitude())}", True, (255, 255, 255))
-    WIN.blit(label, (108, game.HEIGHT-114))
+        debug_text = [
+            f"Position: {round(game.LAST_PLAYER_POS)}",
+            f"Chunk Position: {game.LAST_PLAYER_POS // game.CHUNK_SIZE}",
+            f"Angle: {round(math.degrees(game.player.rotation) - 180) % 360 - 180}",
+            f"Zoom: {round(game.ZOOM, 3)}",
+            f"Mouse Pos: {pygame.mouse.get_pos()}",
+            f"CPU Usage: |{cpu_bar}| {cpu_usage:.1f}%",
+            f"Memory Usage: |{memory_bar}| {memory_usage:.1f}%",
+            f"Minimum FPS: {round(minimum)}",
+            f"Seed: {game.SEED}",
+            f"Difficulty: {game.CURRENT_SHIP_LEVEL}",
+            sprites.masks.get_stats(),
+            sprites.rotated_images.get_stats(),
+            sprites.scaled_images.get_stats()
+        ]
+        for i, text in enumerate(debug_text):
+            WIN.blit(debug_labels[i].get_image(text), (8, 8 + i*30))
+
+    WIN.blit(health_label.get_image(f"{round(game.player.health)} | {game.MAX_PLAYER_HEALTH}"), (game.WIDTH/2-193, game.HEIGHT-114))
+    WIN.blit(armour_label.get_image(f"{round(game.player.armour)}"), (game.WIDTH/2+10, game.HEIGHT-114))
+    WIN.blit(shield_label.get_image(f"{round(game.player.shield)} | {round(game.player.max_shield)}"), (108, game.HEIGHT-226))
+    WIN.blit(boost_label.get_image(f"{round(game.player.boost_amount)} | {game.MAX_BOOST_AMOUNT}"), (108, game.HEIGHT-170))
+    WIN.blit(speed_label.get_image(f"{round(game.player.velocity.magnitude())}"), (108, game.HEIGHT-114))
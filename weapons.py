@@ -36,18 +36,17 @@ class Blaster():
             bullet_position.rotate_about(rotation, ship.position)
             bullet_velocity = Vector(0, -self.speed)
             bullet_velocity.rotate(rotation)
-            bullet = entities.Bullet(
+            game.CHUNKS.projectiles.add(
 
                 position=bullet_position,
                 velocity=bullet_velocity + ship.velocity,
                 rotation=rotation,
-                ship=ship,
+                owner=ship,
                 damage=self.damage,
                 lifetime=3,
-                image=self.load_image
+                image=self.image
                 )
 
-            game.CHUNKS.add_entity(bullet)
             self.time_reloading = 0
 
 